@@ -0,0 +1,241 @@
+"""Minimal stand-ins for the discord.py objects the cogs touch.
+
+They only implement the attributes and coroutines the benchmarks exercise,
+and every REST call is a no-op that just counts itself, so nothing ever
+reaches the network.
+"""
+import asyncio
+import itertools
+from collections import Counter
+
+ids = itertools.count(10**17)
+calls = Counter()
+
+
+class FakeRole:
+    def __init__(self, role_id=None, name="role", guild=None):
+        self.id = role_id or next(ids)
+        self.name = name
+        self.guild = guild
+        self.mention = f"<@&{self.id}>"
+
+    @property
+    def members(self):
+        # discord.py also scans the member cache for this
+        return [member for member in self.guild.members.values() if self in member.roles]
+
+
+class FakeChannel:
+    def __init__(self, guild, channel_id=None, name="channel"):
+        self.id = channel_id or next(ids)
+        self.guild = guild
+        self.name = name
+        self.mention = f"<#{self.id}>"
+        self.category = None
+        self.overwrites = {}
+        # Only used when the channel stands in for a category
+        self.text_channels = []
+
+    async def send(self, content=None, **kwargs):
+        calls["channel.send"] += 1
+        return FakeMessage(content, self.guild.me, self)
+
+    async def fetch_message(self, message_id):
+        calls["channel.fetch_message"] += 1
+        message = FakeMessage(None, self.guild.me, self)
+        message.id = message_id
+        return message
+
+    async def edit(self, name=None, overwrites=None, **kwargs):
+        calls["channel.edit"] += 1
+        if name is not None:
+            self.name = name
+        if overwrites is not None:
+            self.overwrites = overwrites
+
+    async def delete(self):
+        calls["channel.delete"] += 1
+        self.guild.channels.pop(self.id, None)
+        if self.category:
+            self.category.text_channels.remove(self)
+
+
+class FakeVoiceState:
+    def __init__(self, channel=None, self_stream=False, self_video=False):
+        self.channel = channel
+        self.self_stream = self_stream
+        self.self_video = self_video
+        self.self_mute = False
+        self.self_deaf = False
+
+
+class FakeVoiceChannel(FakeChannel):
+    def __init__(self, guild, channel_id=None, name="voice"):
+        super().__init__(guild, channel_id, name)
+        self.voice_states = {}
+
+    @property
+    def members(self):
+        return [self.guild.members[member_id] for member_id in self.voice_states]
+
+    def connect_member(self, member, self_stream=False, self_video=False):
+        """Puts ``member`` in this channel the way the gateway cache would."""
+        if member.voice and member.voice.channel:
+            member.voice.channel.voice_states.pop(member.id, None)
+        member.voice = FakeVoiceState(self, self_stream, self_video)
+        self.voice_states[member.id] = member.voice
+        return member.voice
+
+
+class FakeMember:
+    def __init__(self, guild, member_id=None, name="member", joined_at=None):
+        self.id = member_id or next(ids)
+        self.guild = guild
+        self.name = name
+        self.display_name = name
+        self.bot = False
+        self.mention = f"<@{self.id}>"
+        self.joined_at = joined_at
+        self.roles = []
+        self.voice = None
+
+    def get_role(self, role_id):
+        return next((role for role in self.roles if role.id == role_id), None)
+
+    async def add_roles(self, *roles, reason=None):
+        calls["member.add_roles"] += 1
+        self.roles.extend(r for r in roles if r not in self.roles)
+
+    async def remove_roles(self, *roles, reason=None):
+        calls["member.remove_roles"] += 1
+        self.roles = [r for r in self.roles if r not in roles]
+
+    async def send(self, content=None, **kwargs):
+        calls["member.send"] += 1
+
+    async def move_to(self, channel):
+        calls["member.move_to"] += 1
+
+
+class FakeGuild:
+    def __init__(self, guild_id=None):
+        self.id = guild_id or next(ids)
+        self.roles = {}
+        self.channels = {}
+        self.members = {}
+        self.default_role = self.add_role(name="@everyone")
+        self.me = self.add_member(name="bot")
+        self.me.bot = True
+
+    def add_role(self, role_id=None, name="role"):
+        role = FakeRole(role_id, name, self)
+        self.roles[role.id] = role
+        return role
+
+    def add_channel(self, channel_id=None, name="channel", cls=FakeChannel):
+        channel = cls(self, channel_id, name)
+        self.channels[channel.id] = channel
+        return channel
+
+    def add_member(self, member_id=None, name="member", joined_at=None):
+        member = FakeMember(self, member_id, name, joined_at)
+        self.members[member.id] = member
+        return member
+
+    async def create_text_channel(self, name, category=None, overwrites=None, **kwargs):
+        calls["guild.create_text_channel"] += 1
+        channel = self.add_channel(name=name)
+        channel.overwrites = overwrites or {}
+        if category:
+            channel.category = category
+            category.text_channels.append(channel)
+        return channel
+
+    @property
+    def voice_channels(self):
+        return [channel for channel in self.channels.values() if isinstance(channel, FakeVoiceChannel)]
+
+    def get_role(self, role_id):
+        return self.roles.get(role_id)
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+    def get_member(self, member_id):
+        return self.members.get(member_id)
+
+
+class FakeMessage:
+    def __init__(self, content, author, channel):
+        self.id = next(ids)
+        self.content = content
+        self.author = author
+        self.channel = channel
+        self.guild = channel.guild
+        self.embeds = []
+
+    async def delete(self):
+        calls["message.delete"] += 1
+
+    async def edit(self, **kwargs):
+        calls["message.edit"] += 1
+
+
+class FakeResponse:
+    def __init__(self):
+        self.deferred = False
+
+    async def defer(self, **kwargs):
+        calls["interaction.defer"] += 1
+        self.deferred = True
+
+    async def send_message(self, content=None, **kwargs):
+        calls["interaction.send_message"] += 1
+
+    async def send_modal(self, modal):
+        calls["interaction.send_modal"] += 1
+
+
+class FakeFollowup:
+    async def send(self, content=None, **kwargs):
+        calls["followup.send"] += 1
+
+
+class FakeInteraction:
+    def __init__(self, user, guild=None):
+        self.user = user
+        self.guild = guild or user.guild
+        self.response = FakeResponse()
+        self.followup = FakeFollowup()
+
+
+class FakeBot:
+    def __init__(self, *guilds):
+        self.guilds = list(guilds)
+        self.loop = asyncio.get_running_loop()
+        self.dispatched = Counter()
+
+    def get_guild(self, guild_id):
+        return next((guild for guild in self.guilds if guild.id == guild_id), None)
+
+    def get_channel(self, channel_id):
+        for guild in self.guilds:
+            channel = guild.get_channel(channel_id)
+            if channel:
+                return channel
+        return None
+
+    def dispatch(self, event, *args):
+        self.dispatched[event] += 1
+
+    async def wait_until_ready(self):
+        return None
+
+    def is_ready(self):
+        return True
+
+    def add_dynamic_items(self, *items):
+        pass
+
+    def remove_dynamic_items(self, *items):
+        pass
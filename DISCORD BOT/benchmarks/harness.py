@@ -0,0 +1,128 @@
+"""Shared helpers for the benchmark scripts: timing, allocation tracking and baselines."""
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+
+def prepare_environment(**env):
+    """Fills in the env vars the cogs read at import time and moves into a scratch directory.
+
+    The cogs persist state in the working directory, so benchmarks never run
+    against the bot's real data files.
+    """
+    for key, value in env.items():
+        os.environ.setdefault(key, str(value))
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    os.chdir(workdir)
+    return workdir
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+def summarize(latencies, elapsed):
+    return {
+        "ops_per_sec": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_us": round(percentile(latencies, 50) * 1e6, 2),
+        "p99_us": round(percentile(latencies, 99) * 1e6, 2),
+    }
+
+
+def time_each(fn, items, warmup=200):
+    for item in items[:warmup]:
+        fn(item)
+    latencies = []
+    started = time.perf_counter()
+    for item in items:
+        t0 = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+async def time_each_async(fn, items):
+    latencies = []
+    started = time.perf_counter()
+    for item in items:
+        t0 = time.perf_counter()
+        await fn(item)
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def allocations(fn, items):
+    """Runs ``fn`` over ``items`` under tracemalloc and reports bytes per item."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        for item in items:
+            fn(item)
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    stats = after.compare_to(before, "filename")
+    allocated = sum(stat.size_diff for stat in stats if stat.size_diff > 0)
+    blocks = sum(stat.count_diff for stat in stats if stat.count_diff > 0)
+    return {
+        "peak_kb": round(peak / 1024, 1),
+        "retained_bytes_per_op": round(allocated / max(len(items), 1), 1),
+        "retained_blocks_per_op": round(blocks / max(len(items), 1), 3),
+    }
+
+
+def load_baseline(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_baseline(path, results):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=4, sort_keys=True)
+
+
+# Sub-microsecond timings and allocation counters jitter between runs; ignore changes below these
+NOISE_FLOOR = {
+    "p50_us": 2, "p99_us": 10,
+    "peak_kb": 16, "retained_bytes_per_op": 64, "retained_blocks_per_op": 1,
+}
+
+
+def compare(results, baseline, tolerance):
+    """Returns ``(case, metric, baseline, current)`` for every regression beyond ``tolerance``."""
+    regressions = []
+    for case, metrics in results.items():
+        previous = baseline.get(case, {})
+        for metric, value in metrics.items():
+            old = previous.get(metric)
+            if not old or not isinstance(value, (int, float)):
+                continue
+            if abs(value - old) < NOISE_FLOOR.get(metric, 0):
+                continue
+            # Throughput should not drop; latency and memory should not grow
+            if metric.endswith("ops_per_sec"):
+                worse = value < old * (1 - tolerance)
+            else:
+                worse = value > old * (1 + tolerance)
+            if worse:
+                regressions.append((case, metric, old, value))
+    return regressions
+
+
+def report(results, regressions=()):
+    for case, metrics in results.items():
+        formatted = "  ".join(f"{k}={v}" for k, v in metrics.items())
+        print(f"{case:<40} {formatted}")
+    for case, metric, old, new in regressions:
+        print(f"REGRESSION {case} {metric}: {old} -> {new}")
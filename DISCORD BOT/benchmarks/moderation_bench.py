@@ -0,0 +1,235 @@
+"""Throughput benchmark for the cogs/moderation.py hot path.
+
+Run from the ``DISCORD BOT`` directory:
+
+    python -m benchmarks.moderation_bench
+    python -m benchmarks.moderation_bench --save-baseline
+    python -m benchmarks.moderation_bench --sizes 10 1000 --messages 5000
+
+Each keyword-list size is benchmarked against four synthetic corpora
+(short chat, long pastes, Unicode-heavy text and adversarial near-misses):
+``scan_content`` with the verdict cache disabled and enabled, and
+the full ``on_message`` path through the moderation pipeline using the
+fakes in ``benchmarks/fakes.py``. Results are compared against the saved
+baseline, and the exit status is 1 if anything regressed beyond
+``--tolerance``.
+
+The ``raid_replay`` cases feed ``SpamDetector`` simulated timelines: busy
+organic chat from established members (with a couple of newcomers saying
+hello) must not start raid mode or mute anyone, and a wave of freshly
+joined accounts must. Either failing also exits with status 1.
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import random
+import sys
+import time
+
+from benchmarks import harness
+from benchmarks.fakes import FakeBot, FakeGuild, FakeMessage, calls
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "moderation_baseline.json")
+
+BASE_KEYWORDS = [
+    "cock", "deepthroat", "dick", "cumshot", "fuck", "sperm",
+    "jerk off", "naked", "ass", "tits", "fingering", "masturbate",
+]
+CHAT_WORDS = (
+    "the a to and of is it you that in for on this with are be have just like "
+    "what study exam today tomorrow notes chapter lecture physics chemistry math "
+    "timer break pomodoro camera done thanks lol ok please help anyone know how"
+).split()
+NEAR_MISSES = [
+    "class", "assess", "passage", "assistant", "dickens", "cockpit", "titsworth",
+    "nakedness", "fuckup", "bass", "embarrass", "scunthorpe", "d i c e", "a.s.a.p",
+]
+UNICODE_SNIPPETS = ["ｓｔｕｄｙ", "нello", "café", "naïve", "𝐞𝐱𝐚𝐦", "😀", "📚", "zero​width", "日本語"]
+
+
+def make_keywords(size, rng):
+    keywords = list(BASE_KEYWORDS)
+    while len(keywords) < size:
+        length = rng.randint(4, 10)
+        keywords.append("".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(length)))
+    return keywords[:size]
+
+
+def make_corpora(count, rng):
+    def chat(words):
+        return " ".join(rng.choice(CHAT_WORDS) for _ in range(words))
+
+    def flagged(text):
+        # Roughly 2% of messages carry a real violation
+        if rng.random() < 0.02:
+            return f"{text} {rng.choice(BASE_KEYWORDS)}"
+        return text
+
+    return {
+        "short_chat": [flagged(chat(rng.randint(2, 15))) for _ in range(count)],
+        "long_paste": [flagged(chat(rng.randint(250, 350))) for _ in range(max(count // 10, 1))],
+        "unicode": [
+            flagged(" ".join(rng.choice(UNICODE_SNIPPETS + CHAT_WORDS) for _ in range(rng.randint(5, 25))))
+            for _ in range(count)
+        ],
+        "near_miss": [
+            " ".join(rng.choice(NEAR_MISSES + CHAT_WORDS) for _ in range(rng.randint(5, 20)))
+            for _ in range(count)
+        ],
+    }
+
+
+def build_cog(keywords):
+    from cogs.moderation import Moderation
+    from utils.rule_sets import RuleSetRegistry
+
+    guild = FakeGuild()
+    guild.add_role(int(os.environ["MUTE_ROLE_ID"]), name="Muted")
+    guild.add_channel(int(os.environ["ABUSE_LOG_CHANNEL_ID"]), name="abuse-log")
+    guild.add_channel(int(os.environ["MOD_LOG_CHANNEL_ID"]), name="mod-log")
+    channels = [guild.add_channel(name=f"chat-{i}") for i in range(20)]
+    members = [guild.add_member(name=f"user{i}") for i in range(2000)]
+
+    cog = Moderation(FakeBot(guild))
+    cog.rule_sets = RuleSetRegistry(f"rules-{len(keywords)}.json", keywords)
+    return cog, channels, members
+
+
+async def bench_size(size, corpora, rng, results):
+    from utils.verdict_cache import VerdictCache
+
+    keywords = make_keywords(size, rng)
+    cog, channels, members = build_cog(keywords)
+    guild_id = channels[0].guild.id
+
+    for name, corpus in corpora.items():
+        # Cold: every message runs normalization + the matcher
+        cog.verdict_cache = VerdictCache(maxsize=0)
+        case = f"scan_content/{size}/{name}"
+        results[case] = harness.time_each(lambda content: cog.scan_content(content, guild_id), corpus)
+        results[case].update(
+            harness.allocations(lambda content: cog.scan_content(content, guild_id), corpus[:500])
+        )
+
+        # Warm: spam waves repeat content, so replay the corpus through the cache
+        cog.verdict_cache = VerdictCache()
+        for content in corpus:
+            cog.scan_content(content, guild_id)
+        case = f"scan_content_cached/{size}/{name}"
+        results[case] = harness.time_each(lambda content: cog.scan_content(content, guild_id), corpus)
+
+    # Full on_message path: handler cost per message plus time for the
+    # pipeline to drain every queued delete, punish and log
+    cog.verdict_cache = VerdictCache(maxsize=0)
+    await cog.cog_load()
+    messages = [
+        FakeMessage(content, rng.choice(members), rng.choice(channels))
+        for corpus in corpora.values() for content in corpus
+    ]
+    started = time.perf_counter()
+    handler = await harness.time_each_async(cog.on_message, messages)
+    pipeline = cog.pipeline
+    while pipeline.scan_queue.qsize() or pipeline.delete_queue.qsize() or pipeline.punish_queue.qsize():
+        await asyncio.sleep(0)
+    await pipeline.scan_queue.join()
+    await pipeline.delete_queue.join()
+    await pipeline.punish_queue.join()
+    elapsed = time.perf_counter() - started
+    handler["end_to_end_ops_per_sec"] = round(len(messages) / elapsed, 1)
+    handler["scan_p99_us"] = round(pipeline.stats["scan"].percentile(99) * 1e6, 2)
+    results[f"on_message/{size}"] = handler
+    await cog.cog_unload()
+
+
+def replay_spam_detector(detector, timeline):
+    """Feeds ``(time, message)`` pairs to ``detector``; returns (raid starts, mute reasons)."""
+    raids = 0
+    mutes = []
+    for now, message in timeline:
+        reason, raid_started = detector.check(message, now)
+        raids += raid_started
+        if reason:
+            mutes.append(reason)
+    return raids, mutes
+
+
+def bench_raid_replay(rng, results, per_minute=2000, minutes=3, members=200):
+    from utils.spam_detector import SpamDetector
+
+    guild = FakeGuild()
+    channels = [guild.add_channel(name=f"chat-{i}") for i in range(5)]
+    joined = datetime.datetime.now(datetime.timezone.utc)
+    regulars = [guild.add_member(name=f"regular{i}", joined_at=joined - datetime.timedelta(days=365))
+                for i in range(members)]
+    newcomers = [guild.add_member(name=f"newcomer{i}", joined_at=joined) for i in range(2)]
+    failures = []
+
+    # Organic: steady traffic spread over established members, no one over the per-user limits
+    interval = 60 / per_minute
+    timeline = [
+        (i * interval, FakeMessage(
+            " ".join(rng.choice(CHAT_WORDS) for _ in range(rng.randint(1, 12))),
+            regulars[i % members], rng.choice(channels)
+        ))
+        for i in range(per_minute * minutes)
+    ]
+    for n, newcomer in enumerate(newcomers):
+        timeline.append((30 + 60 * n + 0.01, FakeMessage("hi everyone!", newcomer, channels[0])))
+    timeline.sort(key=lambda item: item[0])
+    raids, mutes = replay_spam_detector(SpamDetector(), timeline)
+    results[f"raid_replay/organic_{per_minute}_per_min"] = {"messages": len(timeline), "raids": raids, "mutes": len(mutes)}
+    if raids or mutes:
+        failures.append(f"organic traffic started raid mode {raids} times and muted {len(mutes)} ({set(mutes)})")
+
+    # Raid: 30 fresh accounts join and post over 20 seconds on top of quieter chat
+    raiders = [guild.add_member(name=f"raider{i}", joined_at=joined) for i in range(30)]
+    timeline = [
+        (i * 0.5, FakeMessage(rng.choice(CHAT_WORDS), regulars[i % members], rng.choice(channels)))
+        for i in range(120)
+    ]
+    timeline += [
+        (5 + i * 0.7, FakeMessage(f"join my server {i}", raider, rng.choice(channels)))
+        for i, raider in enumerate(raiders)
+    ]
+    timeline.sort(key=lambda item: item[0])
+    raids, mutes = replay_spam_detector(SpamDetector(), timeline)
+    results["raid_replay/fresh_wave"] = {"messages": len(timeline), "raids": raids, "mutes": len(mutes)}
+    if not raids:
+        failures.append("a wave of fresh accounts did not start raid mode")
+    return failures
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--messages", type=int, default=2000, help="messages per corpus")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    harness.prepare_environment(MUTE_ROLE_ID=1, ABUSE_LOG_CHANNEL_ID=2, MOD_LOG_CHANNEL_ID=3)
+    rng = random.Random(args.seed)
+    corpora = make_corpora(args.messages, rng)
+
+    results = {}
+    for size in args.sizes:
+        await bench_size(size, corpora, rng, results)
+    failures = bench_raid_replay(rng, results)
+
+    regressions = harness.compare(results, harness.load_baseline(args.baseline), args.tolerance)
+    harness.report(results, regressions)
+    print(f"Fake REST calls: {dict(calls)}")
+    for failure in failures:
+        print(f"FAILED: {failure}")
+
+    if args.save_baseline:
+        harness.save_baseline(args.baseline, results)
+        print(f"Baseline saved to {args.baseline}")
+    return 1 if regressions or failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
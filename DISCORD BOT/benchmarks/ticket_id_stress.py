@@ -0,0 +1,113 @@
+"""Stress test for ticket ID allocation across concurrent interactions and processes.
+
+Run from the ``DISCORD BOT`` directory:
+
+    python -m benchmarks.ticket_id_stress
+    python -m benchmarks.ticket_id_stress --processes 8 --tickets 500 --block-size 1
+
+Starts ``--processes`` bot processes sharing one tickets database. Each one
+loads the ticket cog against a fake guild and fires ``--tickets`` concurrent
+``create_ticket`` calls. The run fails (exit status 1) if any ticket ID is
+handed out twice, any creation fails, or the database does not hold every
+created ticket.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sqlite3
+import sys
+import time
+
+from benchmarks import harness
+from benchmarks.fakes import FakeBot, FakeGuild, FakeInteraction
+
+ENV = {
+    "TICKET_CATEGORY_ID": 1,
+    "TRANSCRIPTS_CHANNEL_ID": 2,
+    "SUPPORT_ROLE_ID": 3,
+    "TICKET_CREATION_CHANNEL_ID": 4,
+    "TRANSCRIPT_BACKEND": "local",
+}
+
+
+async def run_worker(index, tickets):
+    from cogs.tickets import Tickets
+
+    guild = FakeGuild()
+    guild.add_channel(int(os.environ["TICKET_CATEGORY_ID"]), name="tickets")
+    guild.add_channel(int(os.environ["TICKET_CREATION_CHANNEL_ID"]), name="open-a-ticket")
+    guild.add_role(int(os.environ["SUPPORT_ROLE_ID"]), name="Support")
+    members = [guild.add_member(name=f"p{index}-user{i}") for i in range(tickets)]
+
+    cog = Tickets(FakeBot(guild))
+    await cog.cog_load()
+    # Open tickets other processes created before this one started
+    preloaded = set(cog.tickets)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        cog.create_ticket(FakeInteraction(member), "help_desk") for member in members
+    ))
+    elapsed = time.perf_counter() - started
+
+    ids = [ticket_id for ticket_id in cog.tickets if ticket_id not in preloaded]
+    channel_names = [channel.name for channel in guild.channels.values() if channel.name.startswith("ticket-")]
+    stats = cog.creation_stats["total"]
+    leases = cog.id_allocator.leases
+    # Waits for the background inserts before the store closes
+    await cog.cog_unload()
+    return {
+        "ids": ids,
+        "channels": channel_names,
+        "failed": stats.errors,
+        "leases": leases,
+        "elapsed": elapsed,
+        "p95_ms": round(stats.percentile(95) * 1000, 2),
+    }
+
+
+def worker(args):
+    workdir, index, tickets = args
+    os.chdir(workdir)
+    return asyncio.run(run_worker(index, tickets))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--tickets", type=int, default=300, help="concurrent create_ticket calls per process")
+    parser.add_argument("--block-size", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    # Workers are spawned after this, so they inherit the env and the scratch directory
+    os.environ["TICKET_ID_BLOCK"] = str(args.block_size)
+    workdir = harness.prepare_environment(**ENV)
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    with multiprocessing.Pool(args.processes) as pool:
+        results = pool.map(worker, [(workdir, i, args.tickets) for i in range(args.processes)])
+
+    ids = [ticket_id for result in results for ticket_id in result["ids"]]
+    channels = [name for result in results for name in result["channels"]]
+    failed = sum(result["failed"] for result in results)
+    with sqlite3.connect(os.path.join(workdir, "tickets.db")) as conn:
+        stored = conn.execute("SELECT COUNT(DISTINCT id) FROM tickets").fetchone()[0]
+
+    expected = args.processes * args.tickets
+    duplicates = len(ids) - len(set(ids))
+    print(f"Created {len(ids)}/{expected} tickets in {args.processes} processes "
+          f"(block size {args.block_size}, {sum(r['leases'] for r in results)} leases)")
+    for index, result in enumerate(results):
+        print(f"  process {index}: {len(result['ids'])} tickets in {result['elapsed']:.2f}s, "
+              f"p95 {result['p95_ms']}ms")
+    print(f"Duplicate IDs: {duplicates}  Duplicate channels: {len(channels) - len(set(channels))}  "
+          f"Failed: {failed}  Stored: {stored}")
+
+    ok = duplicates == 0 and len(channels) == len(set(channels)) and failed == 0 and stored == expected
+    print("OK" if ok else "FAILED")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
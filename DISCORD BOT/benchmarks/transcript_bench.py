@@ -0,0 +1,128 @@
+"""Benchmark for mention replacement in ticket transcripts.
+
+Run from the ``DISCORD BOT`` directory:
+
+    python -m benchmarks.transcript_bench
+    python -m benchmarks.transcript_bench --messages 5000 --participants 50 --save-baseline
+
+Builds a synthetic ticket (default 5,000 messages, 50 participants, with
+user, role, channel and emoji tokens mixed into the text) and times the old
+per-user ``str.replace`` loop against ``MentionResolver``, both per message
+and as a full template render. Results are compared against the saved
+baseline like ``moderation_bench``.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+from benchmarks import harness
+from benchmarks.fakes import FakeGuild
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "transcript_baseline.json")
+
+TEMPLATE = (
+    "{% for m in messages %}<p><b>{{ m.author }}</b> {{ m.timestamp }}: "
+    "{{ m.content | replace_mentions(users) }}</p>\n{% endfor %}"
+)
+WORDS = "please help my exam timer role is broken can someone check the study channel thanks".split()
+
+
+def legacy_replace_mentions(content, users):
+    # The filter as it was before MentionResolver, kept for comparison
+    for user_id, username in users.items():
+        content = content.replace(f"<@{user_id}>", f"@{username}")
+        content = content.replace(f"<@!{user_id}>", f"@{username}")
+    return content
+
+
+def make_ticket(message_count, participant_count, rng):
+    guild = FakeGuild()
+    roles = [guild.add_role(name=f"role{i}") for i in range(10)]
+    channels = [guild.add_channel(name=f"chat-{i}") for i in range(10)]
+    members = [guild.add_member(name=f"user{i}") for i in range(participant_count)]
+    users = {str(member.id): member.name for member in members}
+
+    def token():
+        roll = rng.random()
+        if roll < 0.5:
+            return f"<@{rng.choice(members).id}>"
+        if roll < 0.6:
+            return f"<@!{rng.choice(members).id}>"
+        if roll < 0.75:
+            return rng.choice(roles).mention
+        if roll < 0.9:
+            return rng.choice(channels).mention
+        return f"<:pepe{rng.randint(0, 9)}:{rng.randint(10**17, 10**18)}>"
+
+    messages = []
+    for _ in range(message_count):
+        parts = [rng.choice(WORDS) for _ in range(rng.randint(5, 30))]
+        for _ in range(rng.randint(0, 3)):
+            parts.insert(rng.randrange(len(parts) + 1), token())
+        messages.append({
+            "author": rng.choice(members).name,
+            "timestamp": "2024-01-01 12:00",
+            "content": " ".join(parts),
+        })
+    return guild, users, messages
+
+
+def render(filter_fn, users, messages):
+    from jinja2 import Environment
+
+    env = Environment()
+    env.filters["replace_mentions"] = filter_fn
+    template = env.from_string(TEMPLATE)
+    started = time.perf_counter()
+    output = template.render(messages=messages, users=users)
+    return time.perf_counter() - started, output
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--participants", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    from utils.mentions import MentionResolver
+
+    rng = random.Random(args.seed)
+    guild, users, messages = make_ticket(args.messages, args.participants, rng)
+    contents = [message["content"] for message in messages]
+    size = f"{args.messages}x{args.participants}"
+
+    results = {}
+    results[f"legacy_filter/{size}"] = harness.time_each(lambda c: legacy_replace_mentions(c, users), contents)
+    resolver = MentionResolver(users, guild)
+    results[f"mention_resolver/{size}"] = harness.time_each(resolver.replace, contents)
+
+    legacy_elapsed, _ = render(legacy_replace_mentions, users, messages)
+    resolver_elapsed, output = render(
+        lambda content, users: users.replace(content), MentionResolver(users, guild), messages
+    )
+    results[f"render_legacy/{size}"] = {"render_ms": round(legacy_elapsed * 1000, 2)}
+    results[f"render_resolver/{size}"] = {"render_ms": round(resolver_elapsed * 1000, 2)}
+
+    # Sanity check: nothing resolvable should be left in the output
+    unresolved = output.count("<@") + output.count("<#") + output.count("<:")
+    if unresolved:
+        print(f"WARNING: {unresolved} mention tokens left unresolved")
+
+    regressions = harness.compare(results, harness.load_baseline(args.baseline), args.tolerance)
+    harness.report(results, regressions)
+    print(f"Render speedup: {legacy_elapsed / resolver_elapsed:.1f}x")
+
+    if args.save_baseline:
+        harness.save_baseline(args.baseline, results)
+        print(f"Baseline saved to {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
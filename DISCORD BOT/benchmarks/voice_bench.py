@@ -0,0 +1,211 @@
+"""Benchmark for rebuilding voice compliance state on startup and reconnect.
+
+Run from the ``DISCORD BOT`` directory:
+
+    python -m benchmarks.voice_bench
+    python -m benchmarks.voice_bench --members 20000 --channels 40 --save-baseline
+
+Fills a fake guild with ``--members`` members spread over ``--channels``
+monitored voice channels (plus a few unmonitored ones) and times
+``Voice.rebuild_state``:
+
+* ``cold``: a fresh cog, as on first start;
+* ``warm``: a second pass over unchanged voice states, as on resume;
+* ``drift``: after members left, joined or toggled their camera while the
+  bot was away;
+* ``restart``: a new cog reloading the saved compliance snapshot.
+
+Each run also checks the rebuilt state against the voice states and
+reports the role edits it queued. The ``study_*`` cases replay ``--days``
+days of sessions for the same members into ``StudyStats`` and report the
+credit rate, flush time, bytes on disk per member-day and leaderboard
+latency. Results are compared against the saved
+baseline like ``moderation_bench``.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+from benchmarks import harness
+from benchmarks.fakes import FakeBot, FakeGuild, FakeVoiceChannel, calls
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "voice_baseline.json")
+
+ENV = {
+    "AFK_VC_ID": 1,
+    "COMPLIANCE_ROLE_ID": 2,
+}
+
+
+def build_guild(member_count, channel_count, rng):
+    guild = FakeGuild()
+    guild.add_channel(int(os.environ["AFK_VC_ID"]), name="afk", cls=FakeVoiceChannel)
+    role = guild.add_role(int(os.environ["COMPLIANCE_ROLE_ID"]), name="On Camera")
+    monitored = [guild.add_channel(name=f"study-{i}", cls=FakeVoiceChannel) for i in range(channel_count)]
+    lounges = [guild.add_channel(name=f"lounge-{i}", cls=FakeVoiceChannel) for i in range(3)]
+
+    for i in range(member_count):
+        member = guild.add_member(name=f"user{i}")
+        roll = rng.random()
+        if roll < 0.9:
+            channel = rng.choice(monitored)
+        elif roll < 0.95:
+            channel = rng.choice(lounges)
+        else:
+            # Not in voice; some still hold the role from a session that ended while offline
+            if rng.random() < 0.5:
+                member.roles.append(role)
+            continue
+        camera = rng.random() < 0.7
+        channel.connect_member(member, self_video=camera)
+        if camera and rng.random() < 0.8:
+            member.roles.append(role)
+    return guild, monitored, lounges
+
+
+def drift(guild, monitored, rng, fraction):
+    """Applies the voice changes a bot would miss while disconnected."""
+    members = [m for m in guild.members.values() if not m.bot]
+    for member in rng.sample(members, int(len(members) * fraction)):
+        roll = rng.random()
+        if roll < 0.3 and member.voice:
+            member.voice.channel.voice_states.pop(member.id, None)
+            member.voice = None
+        elif roll < 0.6:
+            rng.choice(monitored).connect_member(member, self_video=rng.random() < 0.5)
+        elif member.voice:
+            member.voice.self_video = not member.voice.self_video
+
+
+def verify(cog, guild):
+    """Returns the number of members whose tracking disagrees with their voice state."""
+    errors = 0
+    for member in guild.members.values():
+        if member.bot:
+            continue
+        voice = member.voice
+        monitored = bool(voice and voice.channel and voice.channel.id in cog.monitored_vcs)
+        compliant = monitored and (voice.self_stream or voice.self_video)
+        if (member.id in cog.user_compliance) != monitored:
+            errors += 1
+        elif (str(member.id) in cog.scheduler) != (monitored and not compliant):
+            errors += 1
+    return errors
+
+
+async def timed_rebuild(cog, guild):
+    calls.clear()
+    started = time.perf_counter()
+    cog.rebuild_state()
+    elapsed = time.perf_counter() - started
+    queued = len(cog.roles.pending)
+    await cog.roles.flush()
+    return {
+        "rebuild_ms": round(elapsed * 1000, 2),
+        "role_edits": calls["member.add_roles"] + calls["member.remove_roles"],
+        "queued": queued,
+        "mismatches": verify(cog, guild),
+    }
+
+
+async def bench_study_stats(member_ids, channel_ids, days, rng, results, size):
+    from utils.study_stats import CHANNEL, MEMBER, PERIODS, StudyStats, current_day
+
+    first_day = current_day() - days + 1
+    sessions = []
+    for day in range(first_day, first_day + days):
+        for member_id in member_ids:
+            if rng.random() < 0.3:
+                start = day * 86400 + rng.randrange(82800)
+                sessions.append((member_id, rng.choice(channel_ids), start, start + rng.randint(600, 10800), rng.random() < 0.7))
+
+    stats = StudyStats("study_stats_bench.db")
+    await stats.open()
+    results[f"study_credit/{size}x{days}d"] = harness.time_each(lambda session: stats.credit(*session), sessions, warmup=0)
+
+    rows = len(stats.pending)
+    started = time.perf_counter()
+    await stats.flush()
+    flush_elapsed = time.perf_counter() - started
+
+    queries = [(kind, period, metric) for kind in (MEMBER, CHANNEL) for period in PERIODS for metric in ("camera", "voice")]
+    results[f"study_leaderboard/{size}x{days}d"] = harness.time_each(
+        lambda query: stats.leaderboard(*query), queries * 50, warmup=0
+    )
+    await stats.close()
+    results[f"study_flush/{size}x{days}d"] = {
+        "flush_ms": round(flush_elapsed * 1000, 2),
+        "bytes_per_row": round(os.path.getsize("study_stats_bench.db") / rows, 1),
+    }
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=5000)
+    parser.add_argument("--channels", type=int, default=20)
+    parser.add_argument("--days", type=int, default=30, help="days of study sessions to replay")
+    parser.add_argument("--drift", type=float, default=0.1, help="fraction of members that change while offline")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    harness.prepare_environment(**ENV)
+    from cogs.voice import Voice
+
+    rng = random.Random(args.seed)
+    guild, monitored, _ = build_guild(args.members, args.channels, rng)
+    with open("monitored_vcs.json", "w") as f:
+        json.dump([channel.id for channel in monitored], f)
+    bot = FakeBot(guild)
+    size = f"{args.members}x{args.channels}"
+
+    results = {}
+    cog = Voice(bot)
+    results[f"cold/{size}"] = await timed_rebuild(cog, guild)
+    results[f"warm/{size}"] = await timed_rebuild(cog, guild)
+    drift(guild, monitored, rng, args.drift)
+    results[f"drift/{size}"] = await timed_rebuild(cog, guild)
+
+    # Escalate a few members, then "crash" and come back with a new cog
+    escalated = [int(key) for key in list(cog.scheduler.entries)[:100]]
+    for member_id in escalated:
+        cog.user_compliance[member_id]["warn_count"] = 2
+        cog.schedule_check(guild.get_member(member_id))
+    started = time.perf_counter()
+    await cog.scheduler.stop()
+    results[f"snapshot/{size}"] = {
+        "write_ms": round((time.perf_counter() - started) * 1000, 2),
+        "entries": len(cog.scheduler),
+    }
+
+    restarted = Voice(bot)
+    results[f"restart/{size}"] = await timed_rebuild(restarted, guild)
+    lost = sum(restarted.user_compliance[m]["warn_count"] != 2 for m in escalated)
+    await restarted.scheduler.stop()
+
+    member_ids = [member.id for member in guild.members.values() if not member.bot]
+    await bench_study_stats(member_ids, [channel.id for channel in monitored], args.days, rng, results, size)
+
+    regressions = harness.compare(results, harness.load_baseline(args.baseline), args.tolerance)
+    harness.report(results, regressions)
+
+    failed = lost or any(case["mismatches"] for case in results.values() if "mismatches" in case)
+    if lost:
+        print(f"FAILED: {lost} warn counts lost across restart")
+    if failed:
+        print("FAILED: rebuilt state does not match voice states")
+
+    if args.save_baseline:
+        harness.save_baseline(args.baseline, results)
+        print(f"Baseline saved to {args.baseline}")
+    return 1 if regressions or failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
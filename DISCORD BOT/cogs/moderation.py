@@ -1,94 +1,426 @@
 import discord
-from discord.ext import commands
-import re
-import json
+from discord.ext import commands, tasks
+import asyncio
 import os
+import re
+import time
+import typing
 from datetime import datetime
+from utils.keyword_matcher import KeywordMatch
+from utils.log_digest import AbuseLogAggregator
+from utils.mod_pipeline import ModerationPipeline
+from utils.normalizer import normalize
+from utils.rule_sets import RuleSetRegistry
+from utils.scheduler import DeadlineScheduler
+from utils.spam_detector import SpamDetector
+from utils.verdict_cache import VerdictCache
+from utils.warning_store import WarningStore
+
+class Duration(commands.Converter):
+    """Parses durations like ``30m``, ``12h`` or ``1d12h`` into seconds."""
+    UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+    PATTERN = re.compile(r"(\d+)([smhdw])")
+
+    async def convert(self, ctx, argument):
+        argument = argument.lower()
+        parts = self.PATTERN.findall(argument)
+        if not parts or "".join(n + u for n, u in parts) != argument:
+            raise commands.BadArgument(f"Invalid duration: {argument}")
+        return sum(int(n) * self.UNITS[u] for n, u in parts)
+
+def format_duration(seconds):
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds >= size and seconds % size == 0:
+            return f"{seconds // size}{unit}"
+    return f"{seconds}s"
 
 class Moderation(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # Seeds the default rule set when RULES_FILE does not exist yet
         self.NSFW_KEYWORDS = [
             "cock", "deepthroat", "dick", "cumshot", "fuck", "sperm",
             "jerk off", "naked", "ass", "tits", "fingering", "masturbate",
             # ... (rest of your NSFW keywords)
         ]
+        self.RULES_FILE = 'moderation_rules.json'
+        self.rule_sets = RuleSetRegistry(self.RULES_FILE, self.NSFW_KEYWORDS)
+        self.verdict_cache = VerdictCache(
+            maxsize=int(os.getenv("VERDICT_CACHE_SIZE", 4096)),
+            ttl=float(os.getenv("VERDICT_CACHE_TTL", 300))
+        )
         self.WARNINGS_FILE = 'warnings.json'
+        self.WARNINGS_JOURNAL_FILE = 'warnings.journal'
         self.MUTE_ROLE_ID = int(os.getenv("MUTE_ROLE_ID"))
         self.ABUSE_LOG_CHANNEL_ID = int(os.getenv("ABUSE_LOG_CHANNEL_ID"))
         self.MOD_LOG_CHANNEL_ID = int(os.getenv("MOD_LOG_CHANNEL_ID"))
-        self.user_warnings = self.load_warnings()
+        self.warning_store = WarningStore(self.WARNINGS_FILE, self.WARNINGS_JOURNAL_FILE)
+        self.WARNING_EXPIRY_DAYS = float(os.getenv("WARNING_EXPIRY_DAYS", 30))
+        self.AUTO_MUTE_SECONDS = int(float(os.getenv("AUTO_MUTE_HOURS", 24)) * 3600)
+        # Warning expiries and timed unmutes share one persisted deadline heap
+        self.SCHEDULE_FILE = 'moderation_schedule.json'
+        self.scheduler = DeadlineScheduler(self.run_scheduled, self.SCHEDULE_FILE)
+        self.abuse_log = AbuseLogAggregator(
+            self.send_abuse_log,
+            window=float(os.getenv("ABUSE_LOG_WINDOW", 3))
+        )
+        self.spam_detector = SpamDetector(
+            user_limit=int(os.getenv("SPAM_USER_LIMIT", 6)),
+            channel_limit=int(os.getenv("SPAM_CHANNEL_LIMIT", 50)),
+            raid_posters=int(os.getenv("RAID_POSTER_LIMIT", 8)),
+            raid_fresh_share=float(os.getenv("RAID_FRESH_SHARE", 0.3))
+        )
+        # Members muted by the pipeline whose role update may not be cached yet
+        self.recently_muted = {}
+        # Fire-and-forget announcements, kept so they can be cancelled on unload
+        self.background_tasks = set()
+
+        # Scanning and actions run on background workers, not in on_message
+        self.pipeline = ModerationPipeline(
+            scan=self.scan_message,
+            delete=self.delete_flagged_message,
+            punish=self.punish_member,
+            log=self.log_violation,
+            workers=int(os.getenv("MOD_SCAN_WORKERS", 4)),
+            queue_size=int(os.getenv("MOD_QUEUE_SIZE", 1000)),
+            log_queue_size=int(os.getenv("MOD_LOG_QUEUE_SIZE", 200)),
+        )
 
-    def load_warnings(self):
-        if os.path.exists(self.WARNINGS_FILE):
-            with open(self.WARNINGS_FILE, 'r') as f:
-                return json.load(f)
-        return {}
+    async def cog_load(self):
+        self.pipeline.start()
+        self.compact_warnings.start()
+        if self.bot.is_ready():
+            self.start_scheduler()
 
-    def save_warnings(self):
-        with open(self.WARNINGS_FILE, 'w') as f:
-            json.dump(self.user_warnings, f, indent=4)
+    async def cog_unload(self):
+        await self.pipeline.stop()
+        self.compact_warnings.cancel()
+        await self.scheduler.stop()
+        for task in self.background_tasks:
+            task.cancel()
+        await asyncio.gather(*self.background_tasks, return_exceptions=True)
+        await self.warning_store.compact()
+        self.warning_store.close()
+
+    @tasks.loop(minutes=10)
+    async def compact_warnings(self):
+        try:
+            await self.warning_store.compact()
+        except Exception as e:
+            print(f"Warning store compaction failed: {e}")
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # Unmutes need the guild cache, so overdue jobs only fire once it is ready
+        if self.scheduler.task is None:
+            self.start_scheduler()
+
+    def start_scheduler(self):
+        if self.WARNING_EXPIRY_DAYS > 0:
+            # Warnings issued before expiry was enabled have no deadline yet
+            for user_id, entries in self.warning_store.warnings.items():
+                for entry in entries:
+                    if entry["id"] is not None and entry["timestamp"]:
+                        self.schedule_warning_expiry(user_id, entry, only_missing=True)
+        self.scheduler.start()
+
+    def schedule_warning_expiry(self, user_id, entry, only_missing=False):
+        key = f"warning:{user_id}:{entry['id']}"
+        if only_missing and key in self.scheduler:
+            return
+        self.scheduler.schedule(
+            key,
+            entry["timestamp"] + self.WARNING_EXPIRY_DAYS * 86400,
+            {"action": "expire_warning", "user": str(user_id), "warning": entry["id"]}
+        )
+
+    def schedule_unmute(self, guild_id, member_id, seconds):
+        self.scheduler.schedule_in(
+            f"mute:{guild_id}:{member_id}",
+            seconds,
+            {"action": "unmute", "guild": guild_id, "user": member_id}
+        )
+
+    async def run_scheduled(self, key, payload):
+        if payload["action"] == "expire_warning":
+            self.warning_store.expire(payload["user"], payload["warning"])
+        elif payload["action"] == "unmute":
+            guild = self.bot.get_guild(payload["guild"])
+            member = guild.get_member(payload["user"]) if guild else None
+            mute_role = guild.get_role(self.MUTE_ROLE_ID) if guild else None
+            if not member or not mute_role or mute_role not in member.roles:
+                return
+
+            await member.remove_roles(mute_role, reason="Timed mute expired")
+            log_channel = guild.get_channel(self.MOD_LOG_CHANNEL_ID)
+            if log_channel:
+                embed = discord.Embed(
+                    title="Mute Expired",
+                    description=f"{member.mention} has been unmuted",
+                    color=discord.Color.green()
+                )
+                await log_channel.send(embed=embed)
+        elif payload["action"] == "end_raid":
+            if self.in_raid_mode(payload["guild"]):
+                self.schedule_raid_end(payload["guild"])
+                return
+            # A job restored after a restart outlives the raid it was armed for
+            if not self.spam_detector.clear_expired_raid(payload["guild"]):
+                return
+            guild = self.bot.get_guild(payload["guild"])
+            if guild:
+                await self.announce_raid_mode(guild, False)
 
     @commands.Cog.listener()
     async def on_message(self, message):
         if message.author.bot or isinstance(message.channel, discord.DMChannel):
             return
 
-        if await self.check_nsfw_content(message.content):
-            await self.handle_nsfw_message(message)
-            await message.delete()
+        reason, raid_started = self.spam_detector.check(message)
+        if raid_started:
+            self.run_in_background(self.announce_raid_mode(message.guild, True))
+            self.schedule_raid_end(message.guild.id)
+        if reason:
+            # Spam skips the keyword scan and goes straight to delete + mute
+            self.pipeline.flag(message, [], reason)
+            return
+
+        self.pipeline.submit(message)
+
+    @commands.Cog.listener()
+    async def on_message_edit(self, before, after):
+        if after.author.bot or isinstance(after.channel, discord.DMChannel):
+            return
+
+        # Embed-only edits and link previews leave the text untouched
+        if VerdictCache.key(before.content) == VerdictCache.key(after.content):
+            return
+
+        self.pipeline.submit(after)
+
+    def run_in_background(self, coro):
+        task = asyncio.create_task(coro)
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_task_done)
+        return task
 
-    async def check_nsfw_content(self, content):
-        content_lower = content.lower()
-        return any(re.search(rf'\b{re.escape(keyword)}\b', content_lower) 
-                for keyword in self.NSFW_KEYWORDS)
+    def background_task_done(self, task):
+        self.background_tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            print(f"Background moderation task failed: {task.exception()}")
 
-    async def handle_nsfw_message(self, message):
+    def in_raid_mode(self, guild_id):
+        return self.spam_detector.in_raid_mode(guild_id)
+
+    def schedule_raid_end(self, guild_id):
+        # Later bursts extend raid mode; the job re-arms itself until it has really ended
+        self.scheduler.schedule_in(
+            f"raid:{guild_id}",
+            self.spam_detector.raid_remaining(guild_id),
+            {"action": "end_raid", "guild": guild_id}
+        )
+
+    async def announce_raid_mode(self, guild, active):
+        self.bot.dispatch("raid_mode", guild, active)
+        log_channel = guild.get_channel(self.MOD_LOG_CHANNEL_ID)
+        if not log_channel:
+            return
+
+        if active:
+            embed = discord.Embed(
+                title="Raid Mode Enabled",
+                description=(
+                    "Message bursts detected. Members who joined recently are muted "
+                    "when they post until raid mode ends."
+                ),
+                color=discord.Color.red()
+            )
+        else:
+            embed = discord.Embed(title="Raid Mode Disabled", color=discord.Color.green())
+        try:
+            await log_channel.send(embed=embed)
+        except discord.Forbidden:
+            pass
+
+    def scan_content(self, content, guild_id=None):
+        generation, scope, matcher = self.rule_sets.matcher_for(guild_id)
+        verdict = self.verdict_cache.get(content, generation, scope)
+        if verdict is None:
+            # One normalization pass shared by every rule; spans map back to the raw text
+            normalized = normalize(content)
+            verdict = [
+                KeywordMatch(match.keyword, *normalized.span(match.start, match.end))
+                for match in matcher.find_all(normalized.text)
+            ]
+            self.verdict_cache.put(content, generation, verdict, scope)
+        return verdict
+
+    def scan_message(self, message):
+        return self.scan_content(message.content, message.guild.id)
+
+    async def check_nsfw_content(self, content, guild_id=None):
+        # Returns the matched terms with their offsets; empty list means clean
+        return self.scan_content(content, guild_id)
+
+    async def delete_flagged_message(self, message, matches, reason=None):
+        try:
+            await message.delete()
+        except discord.NotFound:
+            pass
+
+    async def punish_member(self, message, matches, reason=None):
         mute_role = message.guild.get_role(self.MUTE_ROLE_ID)
-        if mute_role:
-            try:
-                await message.author.add_roles(mute_role)
-                
-                # User notification
-                try:
-                    embed = discord.Embed(
-                        title="Content Violation",
-                        description="You've been muted for posting inappropriate content.",
-                        color=discord.Color.red()
-                    )
-                    await message.author.send(embed=embed)
-                except discord.Forbidden:
-                    pass
-
-                # Log to abuse channel
-                log_channel = message.guild.get_channel(self.ABUSE_LOG_CHANNEL_ID)
-                if log_channel:
-                    embed = discord.Embed(
-                        title="NSFW Content Detected",
-                        description=f"{message.author.mention} posted restricted content",
-                        color=discord.Color.orange()
-                    )
-                    embed.add_field(name="Message", value=message.content[:500], inline=False)
-                    embed.add_field(name="Action", value="Muted + Message Deleted")
-                    await log_channel.send(embed=embed)
-
-            except discord.Forbidden:
-                pass
+        if not mute_role:
+            return
+
+        # Repeat offenders in a flood are already muted; skip the role edit and DM
+        now = time.monotonic()
+        if mute_role in message.author.roles or self.is_recently_muted(message.author.id, now):
+            return
+
+        try:
+            await message.author.add_roles(mute_role)
+            self.recently_muted[message.author.id] = now
+        except discord.Forbidden:
+            return
+
+        # User notification
+        try:
+            embed = discord.Embed(
+                title="Spam Detected" if reason else "Content Violation",
+                description=(
+                    f"You've been muted automatically ({reason})." if reason
+                    else "You've been muted for posting inappropriate content."
+                ),
+                color=discord.Color.red()
+            )
+            await message.author.send(embed=embed)
+        except discord.Forbidden:
+            pass
+
+    def is_recently_muted(self, member_id, now):
+        if len(self.recently_muted) > 1000:
+            self.recently_muted = {
+                muted_id: muted_at for muted_id, muted_at in self.recently_muted.items()
+                if now - muted_at < 60
+            }
+        return now - self.recently_muted.get(member_id, float("-inf")) < 60
+
+    async def log_violation(self, message, matches, reason=None):
+        self.abuse_log.add(message.guild.id, message, matches, reason)
+
+    async def send_abuse_log(self, guild_id, embed):
+        guild = self.bot.get_guild(guild_id)
+        log_channel = guild.get_channel(self.ABUSE_LOG_CHANNEL_ID) if guild else None
+        if log_channel:
+            await log_channel.send(embed=embed)
+
+    @commands.command()
+    @commands.has_any_role("Admin", "Moderator")
+    async def raidmode(self, ctx, action: str = "status"):
+        action = action.lower()
+        if action in ("on", "off"):
+            if self.spam_detector.set_raid_mode(ctx.guild.id, action == "on"):
+                await self.announce_raid_mode(ctx.guild, action == "on")
+            if action == "on":
+                self.schedule_raid_end(ctx.guild.id)
+            else:
+                self.scheduler.cancel(f"raid:{ctx.guild.id}")
+            await ctx.send(f"Raid mode {action}")
+        elif action == "status":
+            state = "on" if self.in_raid_mode(ctx.guild.id) else "off"
+            await ctx.send(f"Raid mode is {state}")
+        else:
+            await ctx.send("Invalid action. Use on/off/status")
+
+    @commands.command()
+    @commands.has_any_role("Admin")
+    async def rules(self, ctx, action: str, *, terms: str = ""):
+        action = action.lower()
+        terms = terms.split(",")
+        try:
+            if action == "add" and any(t.strip() for t in terms):
+                rule_set = await self.rule_sets.add(ctx.guild.id, terms)
+                await ctx.send(f"Rule set updated to v{rule_set['version']} ({len(rule_set['keywords'])} terms)")
+                return
+            if action == "remove" and any(t.strip() for t in terms):
+                rule_set = await self.rule_sets.remove(ctx.guild.id, terms)
+                await ctx.send(f"Rule set updated to v{rule_set['version']} ({len(rule_set['keywords'])} terms)")
+                return
+            if action == "reload":
+                rule_sets = await self.rule_sets.reload()
+                await ctx.send(f"Reloaded {len(rule_sets)} rule sets from {self.RULES_FILE}")
+                return
+        except ValueError as e:
+            # The current rule sets stay active and the file is left untouched
+            await ctx.send(f"❌ {e}")
+            return
+
+        if action == "list":
+            scope = self.rule_sets.scope(ctx.guild.id)
+            rule_set = self.rule_sets.get(ctx.guild.id)
+            embed = discord.Embed(
+                title=f"Rule Set: {'this server' if scope != 'default' else 'default'}",
+                description=", ".join(f"||{k}||" for k in rule_set["keywords"])[:4000] or "No terms",
+                color=0x7289da
+            )
+            embed.set_footer(text=f"Version {rule_set['version']} · {len(rule_set['keywords'])} terms")
+            await ctx.send(embed=embed)
+        else:
+            await ctx.send("Invalid action. Use add/remove/reload/list (separate terms with commas)")
+
+    @commands.command()
+    @commands.has_any_role("Admin", "Moderator")
+    async def modstats(self, ctx):
+        depths = self.pipeline.depths()
+        embed = discord.Embed(title="Moderation Pipeline", color=0x7289da)
+        for stage, stats in self.pipeline.stats.items():
+            embed.add_field(
+                name=stage.title(),
+                value=(
+                    f"Queued: {depths[stage]}\n"
+                    f"Processed: {stats.processed}\n"
+                    f"p50: {stats.percentile(50) * 1000:.1f}ms\n"
+                    f"p99: {stats.percentile(99) * 1000:.1f}ms\n"
+                    f"Dropped: {stats.dropped} / Errors: {stats.errors}"
+                )
+            )
+        embed.add_field(name="Inline Scans (queue full)", value=self.pipeline.inline_scans, inline=False)
+        cache = self.verdict_cache
+        embed.add_field(
+            name="Verdict Cache",
+            value=(
+                f"Entries: {len(cache.entries)}/{cache.maxsize}\n"
+                f"Hits: {cache.hits} / Misses: {cache.misses} ({cache.hit_rate():.0%})\n"
+                f"Evictions: {cache.evictions}"
+            ),
+            inline=False
+        )
+        embed.add_field(
+            name="Abuse Log",
+            value=(
+                f"Violations: {self.abuse_log.violations}\n"
+                f"Posts: {self.abuse_log.posts}"
+            ),
+            inline=False
+        )
+        await ctx.send(embed=embed)
 
     @commands.command()
     @commands.has_any_role("Admin", "Moderator")  # Update with your role names
     async def warn(self, ctx, member: discord.Member, *, reason: str = "No reason provided"):
-        user_id = str(member.id)
-        self.user_warnings[user_id] = self.user_warnings.get(user_id, 0) + 1
-        self.save_warnings()
+        record = self.warning_store.add(member.id, ctx.author.id, reason)
+        if self.WARNING_EXPIRY_DAYS > 0:
+            self.schedule_warning_expiry(member.id, {"id": record["seq"], "timestamp": record["timestamp"]})
 
         # Check for mute threshold
-        if self.user_warnings[user_id] >= 5:
+        if self.warning_store.count(member.id) >= 5:
             mute_role = ctx.guild.get_role(self.MUTE_ROLE_ID)
             if mute_role:
                 await member.add_roles(mute_role)
-                self.user_warnings.pop(user_id, None)
-                self.save_warnings()
+                self.warning_store.reset(member.id, ctx.author.id, "Muted after 5 warnings")
+                if self.AUTO_MUTE_SECONDS > 0:
+                    self.schedule_unmute(ctx.guild.id, member.id, self.AUTO_MUTE_SECONDS)
 
         # Send confirmation
         embed = discord.Embed(
@@ -97,26 +429,37 @@ class Moderation(commands.Cog):
             color=discord.Color.yellow()
         )
         embed.add_field(name="Reason", value=reason)
-        embed.add_field(name="Total Warnings", value=self.user_warnings.get(user_id, 0))
+        embed.add_field(name="Total Warnings", value=self.warning_store.count(member.id))
+        if self.WARNING_EXPIRY_DAYS > 0:
+            expires = int(record["timestamp"] + self.WARNING_EXPIRY_DAYS * 86400)
+            embed.add_field(name="Expires", value=f"<t:{expires}:R>")
         await ctx.send(embed=embed)
 
     @commands.command()
     @commands.has_any_role("Admin", "Moderator")
-    async def mute(self, ctx, member: discord.Member, *, reason: str = "No reason provided"):
+    async def mute(self, ctx, member: discord.Member, duration: typing.Optional[Duration] = None,
+                   *, reason: str = "No reason provided"):
         mute_role = ctx.guild.get_role(self.MUTE_ROLE_ID)
         if not mute_role:
             return await ctx.send("Mute role not configured")
 
-        if mute_role in member.roles:
+        if mute_role in member.roles and not duration:
             return await ctx.send("User is already muted")
 
-        await member.add_roles(mute_role)
+        if mute_role not in member.roles:
+            await member.add_roles(mute_role)
+        if duration:
+            self.schedule_unmute(ctx.guild.id, member.id, duration)
+        else:
+            self.scheduler.cancel(f"mute:{ctx.guild.id}:{member.id}")
+
         embed = discord.Embed(
             title="User Muted",
             description=f"{member.mention} has been muted",
             color=discord.Color.red()
         )
         embed.add_field(name="Reason", value=reason)
+        embed.add_field(name="Duration", value=format_duration(duration) if duration else "Until unmuted")
         await ctx.send(embed=embed)
 
     @commands.command()
@@ -130,6 +473,7 @@ class Moderation(commands.Cog):
             return await ctx.send("User is not muted")
 
         await member.remove_roles(mute_role)
+        self.scheduler.cancel(f"mute:{ctx.guild.id}:{member.id}")
         embed = discord.Embed(
             title="User Unmuted",
             description=f"{member.mention} has been unmuted",
@@ -139,28 +483,31 @@ class Moderation(commands.Cog):
 
     @commands.command()
     async def warnings(self, ctx, member: discord.Member):
-        warnings = self.user_warnings.get(str(member.id), 0)
+        history = self.warning_store.history(member.id)
         embed = discord.Embed(
             title="Warning History",
-            description=f"{member.mention} has {warnings} warnings",
+            description=f"{member.mention} has {len(history)} warnings",
             color=discord.Color.orange()
         )
+        # Embeds cap out at 25 fields; show the most recent warnings
+        first = max(len(history) - 10, 0)
+        for number, entry in enumerate(history[first:], start=first + 1):
+            when = (
+                f"<t:{int(entry['timestamp'])}:d>" if entry["timestamp"] else "Unknown date"
+            )
+            moderator = f"<@{entry['moderator']}>" if entry["moderator"] else "Unknown"
+            embed.add_field(
+                name=f"Warning #{number}",
+                value=f"{entry['reason'] or 'No reason recorded'}\nBy {moderator} · {when}",
+                inline=False
+            )
         await ctx.send(embed=embed)
 
     @commands.command()
     @commands.has_any_role("Admin", "Moderator")
     async def del_warn(self, ctx, member: discord.Member, count: int = 1):
-        user_id = str(member.id)
-        current = self.user_warnings.get(user_id, 0)
-        new_count = max(current - count, 0)
-        
-        if new_count == 0:
-            self.user_warnings.pop(user_id, None)
-        else:
-            self.user_warnings[user_id] = new_count
-        
-        self.save_warnings()
-        
+        self.warning_store.remove(member.id, count, ctx.author.id)
+
         embed = discord.Embed(
             title="Warnings Removed",
             description=f"Removed {count} warnings from {member.mention}",
@@ -1,10 +1,12 @@
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 import json
 import os
 import datetime
 import pytz
-import asyncio
+import time
+from utils.channel_renamer import ChannelRenamer
+from utils.scheduler import DeadlineScheduler
 
 class StudyTimer(commands.Cog):
     def __init__(self, bot):
@@ -12,7 +14,25 @@ class StudyTimer(commands.Cog):
         self.DATA_FILE = "study_channels.json"
         self.channels = self.load_data()
         self.timezone = pytz.timezone("Asia/Kolkata")
-        self.scheduled_update.start()
+        self.RENAME_SPREAD = int(os.getenv("RENAME_SPREAD_SECONDS", 600))
+
+        # Renames go out within Discord's per-channel and global limits
+        self.renamer = ChannelRenamer(
+            self.get_channel,
+            spacing=float(os.getenv("RENAME_SPACING_SECONDS", 1)),
+            reason="Exam countdown"
+        )
+        # One deadline per channel at the next midnight its name changes,
+        # offset within RENAME_SPREAD so the renames don't all land at once
+        self.rollovers = DeadlineScheduler(self.on_rollover)
+
+    async def cog_load(self):
+        if self.bot.is_ready():
+            await self.on_ready()
+
+    async def cog_unload(self):
+        await self.rollovers.stop()
+        await self.renamer.stop()
 
     def load_data(self):
         if os.path.exists(self.DATA_FILE):
@@ -30,40 +50,56 @@ class StudyTimer(commands.Cog):
         delta = (exam_date - today).days
         return max(delta, 0)
 
-    async def update_channel_names(self):
+    def next_midnight(self):
+        # Built from the date, so it lands exactly on 00:00:00.000000 local time
+        tomorrow = datetime.datetime.now(self.timezone).date() + datetime.timedelta(days=1)
+        return self.timezone.localize(datetime.datetime.combine(tomorrow, datetime.time()))
+
+    def get_channel(self, channel_id):
         guild = self.bot.get_guild(int(os.getenv("GUILD_ID")))
-        if not guild:
-            return
-
-        for channel_id, channel_data in self.channels.items():
-            try:
-                channel = guild.get_channel(int(channel_id))
-                if not channel:
-                    continue
-
-                days_left = self.get_days_left(channel_data["date"])
-                new_name = f"{channel_data['exam']} : {days_left} Days"
-
-                if channel.name != new_name:
-                    await channel.edit(name=new_name)
-            except Exception as e:
-                print(f"Error updating channel {channel_id}: {e}")
-
-    @tasks.loop(hours=24)
-    async def scheduled_update(self):
-        await self.update_channel_names()
-
-    @scheduled_update.before_loop
-    async def before_scheduled_update(self):
-        await self.bot.wait_until_ready()
-        now = datetime.datetime.now(self.timezone)
-        midnight = now.replace(hour=0, minute=0, second=0) + datetime.timedelta(days=1)
-        delay = (midnight - now).total_seconds()
-        await asyncio.sleep(delay)
+        return guild.get_channel(channel_id) if guild else None
+
+    def plan_channel(self, channel_id):
+        """Queues a rename if the channel's name is out of date and schedules its next change.
+
+        Returns when the queued rename is expected to go out, or None if the
+        name is already right.
+        """
+        key = str(channel_id)
+        channel_data = self.channels.get(key)
+        if channel_data is None:
+            self.rollovers.cancel(key)
+            return None
+
+        days_left = self.get_days_left(channel_data["date"])
+        new_name = f"{channel_data['exam']} : {days_left} Days"
+        channel = self.get_channel(channel_id)
+        due = None
+        if channel and channel.name != new_name:
+            due = self.renamer.request(channel_id, new_name)
+        else:
+            self.renamer.cancel(channel_id)
+
+        # Once the exam day is reached the name stays at 0 Days
+        if days_left > 0:
+            offset = channel_id % self.RENAME_SPREAD if self.RENAME_SPREAD else 0
+            self.rollovers.schedule(key, self.next_midnight().timestamp() + offset)
+        else:
+            self.rollovers.cancel(key)
+        return due
+
+    async def on_rollover(self, key, payload):
+        self.plan_channel(int(key))
+
+    def update_channel_names(self):
+        for channel_id in list(self.channels):
+            self.plan_channel(int(channel_id))
 
     @commands.Cog.listener()
     async def on_ready(self):
-        await self.update_channel_names()
+        self.update_channel_names()
+        self.renamer.start()
+        self.rollovers.start()
 
     @discord.app_commands.command(name="setexam", description="Set exam date for a voice channel")
     @discord.app_commands.describe(
@@ -86,11 +122,13 @@ class StudyTimer(commands.Cog):
             }
             self.save_data()
 
-            days_left = self.get_days_left(date_obj.isoformat())
-            await channel.edit(name=f"{exam_name} : {days_left} Days")
+            due = self.plan_channel(channel.id)
+            note = ""
+            if due is not None and due > time.time() + 5:
+                note = f"\nDiscord limits channel renames, so the new name will show <t:{int(due)}:R>"
 
             await interaction.response.send_message(
-                f"✅ {channel.mention} will count down to {exam_date}",
+                f"✅ {channel.mention} will count down to {exam_date}{note}",
                 ephemeral=True
             )
         except ValueError:
@@ -106,7 +144,8 @@ class StudyTimer(commands.Cog):
         if channel_id in self.channels:
             del self.channels[channel_id]
             self.save_data()
-            await channel.edit(name=channel.name.split(" : ")[0])
+            self.rollovers.cancel(channel_id)
+            self.renamer.request(channel.id, channel.name.split(" : ")[0])
             await interaction.response.send_message(
                 f"✅ Removed exam tracking from {channel.mention}",
                 ephemeral=True
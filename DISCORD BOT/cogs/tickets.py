@@ -1,31 +1,77 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
+from discord import app_commands
 from discord.ui import Select, Button, View, Modal, TextInput
 import json
 import os
-import base64
-import requests
 import datetime
 import asyncio
 import aiohttp
 import io
-from jinja2 import Environment, BaseLoader
+import logging
+import tempfile
+import time
+from jinja2 import Environment, FileSystemLoader
+from utils.mentions import MentionResolver
+from utils.mod_pipeline import StageStats
+from utils.ticket_search import TicketSearchIndex, chunk_lines
+from utils.ticket_store import TicketIdAllocator, TicketStore
+from utils.transcript_log import TranscriptLog
+from utils.transcript_upload import GitHubBackend, LocalDirectoryBackend, S3Backend, TranscriptUploader
+
+logger = logging.getLogger(__name__)
 
 # Configure Jinja2 environment
 def replace_mentions_filter(content, users):
-    for user_id, username in users.items():
-        content = content.replace(f"<@{user_id}>", f"@{username}")
-        content = content.replace(f"<@!{user_id}>", f"@{username}")
-    return content
-
-env = Environment(loader=BaseLoader)
+    if not isinstance(users, MentionResolver):
+        users = MentionResolver(users)
+    return users.replace(content)
+
+# Templates are compiled once and cached by the loader; auto_reload only
+# recompiles when the file's mtime changes. Async mode lets the template
+# iterate an async generator, so messages stream straight from channel.history
+env = Environment(loader=FileSystemLoader("."), enable_async=True)
 env.filters['replace_mentions'] = replace_mentions_filter
 
+class TicketActionButton(discord.ui.DynamicItem[Button], template=r"(?P<action>claim|close)_(?P<ticket_id>[0-9]+)"):
+    """Claim/close button for any ticket.
+
+    Registered once with ``bot.add_dynamic_items``; the ticket is parsed from
+    the ``custom_id`` when a button is pressed, so no per-ticket view has to
+    be kept around or re-registered at startup.
+    """
+
+    def __init__(self, action, ticket_id):
+        if action == "claim":
+            button = Button(style=discord.ButtonStyle.primary, label="Claim Ticket", custom_id=f"claim_{ticket_id}")
+        else:
+            button = Button(style=discord.ButtonStyle.danger, label="Close Ticket", custom_id=f"close_{ticket_id}")
+        super().__init__(button)
+        self.action = action
+        self.ticket_id = ticket_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(match["action"], match["ticket_id"])
+
+    async def callback(self, interaction):
+        cog = interaction.client.get_cog("Tickets")
+        if self.action == "claim":
+            await cog.handle_claim(interaction, self.ticket_id)
+        else:
+            await interaction.response.send_modal(cog.CloseTicketModal(cog, self.ticket_id))
+
 class Tickets(commands.Cog):
+    CREATION_STAGES = ("defer", "allocate", "channel", "message", "followup", "total")
+
     def __init__(self, bot):
         self.bot = bot
+        # Hot set: open tickets only. Closed ones live in the store's archive
         self.tickets = {}
-        self.ticket_counter = 0
+        # Open ticket channels -> ticket ID, for the message listeners
+        self.ticket_channels = {}
+        # Tickets being backfilled -> live messages held back until it finishes
+        self.backfilling = {}
         self.TICKET_CREATION_MESSAGE_ID = None
         
         # Configuration from environment
@@ -35,58 +81,126 @@ class Tickets(commands.Cog):
         self.GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
         self.GITHUB_REPO = os.getenv("GITHUB_REPO")
         self.TICKET_CREATION_CHANNEL_ID = int(os.getenv("TICKET_CREATION_CHANNEL_ID"))
+        self.TRANSCRIPT_BACKEND = os.getenv("TRANSCRIPT_BACKEND", "github").lower()
+        self.http_session = None
+        self.uploader = None
+
+        # Pre-created channels handed out to new tickets during peak hours
+        self.TICKET_POOL_SIZE = int(os.getenv("TICKET_POOL_SIZE", 0))
+        self.TICKET_POOL_HOURS = self.parse_pool_hours(os.getenv("TICKET_POOL_HOURS", ""))
+        self.channel_pool = []
+        # Taken from the pool but not renamed yet; a rescan must not hand these out again
+        self.claimed_channels = set()
+        self.pool_lock = asyncio.Lock()
+        self.pool_adopted = False
+        self.creation_stats = {stage: StageStats() for stage in self.CREATION_STAGES}
+        # Fire-and-forget work (uploads, pool refills), kept so it can be cancelled on unload
+        self.background_tasks = set()
         
-        # Persistent data files
+        # Persistent data; the old flat files are only read once, for migration
+        self.store = TicketStore(os.getenv("TICKETS_DB", "tickets.db"))
+        self.id_allocator = TicketIdAllocator(self.store, int(os.getenv("TICKET_ID_BLOCK", 10)))
         self.TICKETS_FILE = "tickets.json"
         self.TICKET_COUNTER_FILE = "ticket_counter.txt"
         self.TICKET_MESSAGE_FILE = "ticket_message_id.txt"
-        
-        self.load_data()
-        self.bot.loop.create_task(self.setup_ticket_creation_message())
+        self.transcript_log = TranscriptLog(os.getenv("TICKET_LOG_DIR", "ticket_logs"))
+        self.search_index = TicketSearchIndex(os.getenv("TICKET_SEARCH_DB", "ticket_search.db"))
+
+    async def cog_load(self):
+        await self.load_data()
+        self.bot.add_dynamic_items(TicketActionButton)
+        if self.bot.is_ready():
+            await self.on_ready()
+
+        # One pooled session for every transcript upload
+        self.http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=8),
+            timeout=aiohttp.ClientTimeout(total=60)
+        )
+        backend = self.make_transcript_backend()
+        if backend:
+            self.uploader = TranscriptUploader(backend)
+            self.uploader.start()
+
+    async def cog_unload(self):
+        self.bot.remove_dynamic_items(TicketActionButton)
+        self.maintain_channel_pool.cancel()
+        if self.uploader:
+            await self.uploader.stop()
+        for task in self.background_tasks:
+            task.cancel()
+        await asyncio.gather(*self.background_tasks, return_exceptions=True)
+        await self.http_session.close()
+        await self.id_allocator.release()
+        await self.store.close()
+        await self.search_index.close()
+        self.transcript_log.close()
+
+    def make_transcript_backend(self):
+        if self.TRANSCRIPT_BACKEND == "local":
+            return LocalDirectoryBackend(
+                os.getenv("TRANSCRIPT_DIR", "transcripts"),
+                os.getenv("TRANSCRIPT_BASE_URL")
+            )
+        if self.TRANSCRIPT_BACKEND == "s3":
+            return S3Backend(
+                self.http_session,
+                endpoint=os.getenv("S3_ENDPOINT"),
+                bucket=os.getenv("S3_BUCKET"),
+                access_key=os.getenv("S3_ACCESS_KEY"),
+                secret_key=os.getenv("S3_SECRET_KEY"),
+                region=os.getenv("S3_REGION", "us-east-1"),
+                public_url=os.getenv("S3_PUBLIC_URL")
+            )
+        if self.GITHUB_TOKEN:
+            return GitHubBackend(
+                self.http_session,
+                self.GITHUB_TOKEN,
+                self.GITHUB_REPO,
+                api_url=os.getenv("GITHUB_API_URL", "https://api.github.com")
+            )
+        return None
 
     # Data management
-    def load_data(self):
+    async def load_data(self):
         try:
-            # Load ticket counter
-            if os.path.exists(self.TICKET_COUNTER_FILE):
-                with open(self.TICKET_COUNTER_FILE, "r") as f:
-                    self.ticket_counter = int(f.read().strip())
-            
-            # Load ticket message ID
-            if os.path.exists(self.TICKET_MESSAGE_FILE):
-                with open(self.TICKET_MESSAGE_FILE, "r") as f:
-                    self.TICKET_CREATION_MESSAGE_ID = int(f.read().strip())
-            
-            # Load active tickets
-            if os.path.exists(self.TICKETS_FILE):
-                with open(self.TICKETS_FILE, "r") as f:
-                    self.tickets = json.load(f)
-                    
-        except Exception as e:
-            self.bot.logger.error(f"Error loading ticket data: {e}")
+            await self.store.open()
+            await self.search_index.open()
+            migrated = await self.store.migrate(
+                self.TICKETS_FILE,
+                self.TICKET_COUNTER_FILE,
+                self.TICKET_MESSAGE_FILE
+            )
+            if migrated:
+                print(f"Migrated {migrated} tickets to {self.store.path}")
+
+            message_id = await self.store.get_meta("creation_message_id")
+            self.TICKET_CREATION_MESSAGE_ID = int(message_id) if message_id else None
+            archived = await self.store.archive_closed()
+            if archived:
+                print(f"Archived {archived} closed tickets")
+            self.tickets = await self.store.find()
+            self.ticket_channels = {
+                ticket["channel_id"]: ticket_id
+                for ticket_id, ticket in self.tickets.items()
+            }
 
-    def save_data(self):
-        try:
-            with open(self.TICKET_COUNTER_FILE, "w") as f:
-                f.write(str(self.ticket_counter))
-            
-            with open(self.TICKET_MESSAGE_FILE, "w") as f:
-                if self.TICKET_CREATION_MESSAGE_ID:
-                    f.write(str(self.TICKET_CREATION_MESSAGE_ID))
-            
-            with open(self.TICKETS_FILE, "w") as f:
-                json.dump(self.tickets, f, indent=4)
-                
         except Exception as e:
-            self.bot.logger.error(f"Error saving ticket data: {e}")
+            logger.error(f"Error loading ticket data: {e}")
 
     # Ticket creation setup
+    @commands.Cog.listener()
+    async def on_ready(self):
+        await self.setup_ticket_creation_message()
+        if self.TICKET_POOL_SIZE and not self.maintain_channel_pool.is_running():
+            self.maintain_channel_pool.start()
+        await self.reconcile_transcripts()
+
     async def setup_ticket_creation_message(self):
-        await self.bot.wait_until_ready()
         channel = self.bot.get_channel(self.TICKET_CREATION_CHANNEL_ID)
         
         if not channel:
-            self.bot.logger.error("Ticket creation channel not found!")
+            logger.error("Ticket creation channel not found!")
             return
 
         # Recreate dropdown view
@@ -102,11 +216,11 @@ class Tickets(commands.Cog):
         async def select_callback(interaction):
             try:
                 if select.values[0] == "apply_for_staff":
-                    await interaction.response.send_modal(StaffApplicationModal(self))
+                    await interaction.response.send_modal(self.StaffApplicationModal(self))
                 else:
                     await self.create_ticket(interaction, select.values[0])
             except Exception as e:
-                self.bot.logger.error(f"Ticket creation error: {e}")
+                logger.error(f"Ticket creation error: {e}")
                 await interaction.response.send_message("Error creating ticket!", ephemeral=True)
 
         select.callback = select_callback
@@ -124,15 +238,15 @@ class Tickets(commands.Cog):
                     view=view
                 )
                 self.TICKET_CREATION_MESSAGE_ID = message.id
-                self.save_data()
+                await self.store.set_meta("creation_message_id", message.id)
         except discord.NotFound:
-            self.bot.logger.warning("Ticket message not found, creating new one")
+            logger.warning("Ticket message not found, creating new one")
             message = await channel.send(
                 "**Open a Ticket**\nSelect your issue below:",
                 view=view
             )
             self.TICKET_CREATION_MESSAGE_ID = message.id
-            self.save_data()
+            await self.store.set_meta("creation_message_id", message.id)
 
     # Ticket management
     class StaffApplicationModal(Modal, title="Staff Application"):
@@ -171,10 +285,19 @@ class Tickets(commands.Cog):
             await self.cog.close_ticket(interaction, self.ticket_id, self.reason.value)
 
     async def create_ticket(self, interaction, ticket_type, application_data=None):
+        started = stage_started = time.perf_counter()
+
+        def mark(stage):
+            nonlocal stage_started
+            now = time.perf_counter()
+            self.creation_stats[stage].record(now - stage_started)
+            stage_started = now
+
         try:
             await interaction.response.defer(ephemeral=True)
-            self.ticket_counter += 1
-            ticket_id = str(self.ticket_counter)
+            mark("defer")
+            ticket_id = await self.id_allocator.next_id()
+            mark("allocate")
             
             # Create permission overwrites
             guild = interaction.guild
@@ -192,15 +315,20 @@ class Tickets(commands.Cog):
                 )
             }
 
-            # Create ticket channel
-            category = guild.get_channel(self.TICKET_CATEGORY_ID)
-            channel = await guild.create_text_channel(
-                name=f"ticket-{ticket_id}",
-                category=category,
-                overwrites=overwrites
-            )
+            # Take a pre-created channel if one is ready, otherwise create one
+            channel = await self.take_pooled_channel(ticket_id, overwrites)
+            if not channel:
+                category = guild.get_channel(self.TICKET_CATEGORY_ID)
+                channel = await guild.create_text_channel(
+                    name=f"ticket-{ticket_id}",
+                    category=category,
+                    overwrites=overwrites
+                )
+            self.ticket_channels[channel.id] = ticket_id
+            mark("channel")
 
-            # Store ticket data
+            # Store ticket data; the write runs on the store's thread in the
+            # background, ahead of any later claim or close for this ticket
             self.tickets[ticket_id] = {
                 "channel_id": channel.id,
                 "creator": interaction.user.id,
@@ -212,17 +340,14 @@ class Tickets(commands.Cog):
                 "closed_at": None,
                 "application_data": application_data
             }
-            self.save_data()
+            self.store.insert(ticket_id, self.tickets[ticket_id]).add_done_callback(self.report_write_error)
 
-            # Send initial message
-            embed = discord.Embed(
+            # Welcome, application details and action buttons in one message
+            embeds = [discord.Embed(
                 title=f"Ticket #{ticket_id}",
                 description=f"Hello {interaction.user.mention}! Support will be with you shortly.",
                 color=discord.Color.green()
-            )
-            await channel.send(embed=embed)
-
-            # Add application data if exists
+            )]
             if application_data:
                 app_embed = discord.Embed(
                     title="Staff Application Details",
@@ -230,51 +355,145 @@ class Tickets(commands.Cog):
                 )
                 for key, value in application_data.items():
                     app_embed.add_field(name=key.title(), value=value, inline=False)
-                await channel.send(embed=app_embed)
+                embeds.append(app_embed)
 
-            # Add action buttons
             view = View(timeout=None)
-            
-            claim_btn = Button(
-                style=discord.ButtonStyle.primary,
-                label="Claim Ticket",
-                custom_id=f"claim_{ticket_id}"
-            )
-            close_btn = Button(
-                style=discord.ButtonStyle.danger,
-                label="Close Ticket",
-                custom_id=f"close_{ticket_id}"
-            )
-
-            async def claim_callback(interaction):
-                await self.handle_claim(interaction, ticket_id)
-
-            async def close_callback(interaction):
-                await interaction.response.send_modal(
-                    self.CloseTicketModal(self, ticket_id)
-                )
-
-            claim_btn.callback = claim_callback
-            close_btn.callback = close_callback
-            
-            view.add_item(claim_btn)
-            view.add_item(close_btn)
-            
-            await channel.send("Ticket Actions:", view=view)
-            self.bot.add_view(view, message_id=int(ticket_id))
+            view.add_item(TicketActionButton("claim", ticket_id))
+            view.add_item(TicketActionButton("close", ticket_id))
+            await channel.send(embeds=embeds, view=view)
+            mark("message")
 
             await interaction.followup.send(
                 f"Ticket created: {channel.mention}",
                 ephemeral=True
             )
+            mark("followup")
+            self.creation_stats["total"].record(time.perf_counter() - started)
 
         except Exception as e:
-            self.bot.logger.error(f"Ticket creation failed: {e}")
+            self.creation_stats["total"].errors += 1
+            logger.error(f"Ticket creation failed: {e}")
             await interaction.followup.send(
                 "Failed to create ticket. Please contact staff.",
                 ephemeral=True
             )
 
+    def report_write_error(self, future):
+        if not future.cancelled() and future.exception():
+            logger.error(f"Ticket write failed: {future.exception()}")
+
+    # Channel pool
+    @staticmethod
+    def parse_pool_hours(value):
+        """Parses TICKET_POOL_HOURS ("9-23"); ``None`` keeps the pool filled around the clock."""
+        if not value.strip():
+            return None
+        try:
+            start, end = (int(hour) for hour in value.split("-"))
+            if not (0 <= start <= 23 and 0 <= end <= 23):
+                raise ValueError("hours must be 0-23")
+        except ValueError as e:
+            logger.warning(f"Ignoring invalid TICKET_POOL_HOURS {value!r} ({e}); keeping the pool filled all day")
+            return None
+        return start, end
+
+    def in_peak_hours(self):
+        if not self.TICKET_POOL_HOURS:
+            return True
+        start, end = self.TICKET_POOL_HOURS
+        hour = datetime.datetime.now().hour
+        if start <= end:
+            return start <= hour < end
+        return hour >= start or hour < end
+
+    async def take_pooled_channel(self, ticket_id, overwrites):
+        while self.channel_pool:
+            channel_id = self.channel_pool.pop()
+            channel = self.bot.get_channel(channel_id)
+            if not channel:
+                continue
+            self.claimed_channels.add(channel_id)
+            try:
+                await channel.edit(name=f"ticket-{ticket_id}", overwrites=overwrites)
+            except discord.HTTPException as e:
+                # Half-set-up channels are never offered again; the next refill replaces them
+                logger.error(f"Pooled ticket channel unusable: {e}")
+                try:
+                    await channel.delete()
+                except discord.HTTPException as e:
+                    logger.error(f"Couldn't delete unusable pooled channel {channel_id}: {e}")
+                finally:
+                    self.claimed_channels.discard(channel_id)
+                continue
+            self.claimed_channels.discard(channel_id)
+            self.run_in_background(self.refill_channel_pool())
+            return channel
+        return None
+
+    @tasks.loop(minutes=5)
+    async def maintain_channel_pool(self):
+        await self.refill_channel_pool()
+
+    async def refill_channel_pool(self):
+        # One refill at a time, so two never create channels for the same gap
+        async with self.pool_lock:
+            await self._refill_channel_pool()
+
+    async def _refill_channel_pool(self):
+        category = self.bot.get_channel(self.TICKET_CATEGORY_ID)
+        if not category:
+            return
+
+        # Pick up pool channels left over from a previous run, once, before
+        # any have been handed out
+        if not self.pool_adopted:
+            self.pool_adopted = True
+            known = set(self.channel_pool) | self.claimed_channels
+            self.channel_pool.extend(
+                channel.id for channel in category.text_channels
+                if channel.name == "ticket-pool" and channel.id not in known
+            )
+
+        target = self.TICKET_POOL_SIZE if self.in_peak_hours() else 0
+        guild = category.guild
+        try:
+            while len(self.channel_pool) < target:
+                channel = await guild.create_text_channel(
+                    name="ticket-pool",
+                    category=category,
+                    overwrites={
+                        guild.default_role: discord.PermissionOverwrite(read_messages=False),
+                        guild.me: discord.PermissionOverwrite(read_messages=True)
+                    }
+                )
+                self.channel_pool.append(channel.id)
+            while len(self.channel_pool) > target:
+                channel = self.bot.get_channel(self.channel_pool.pop())
+                if channel:
+                    await channel.delete()
+        except discord.HTTPException as e:
+            logger.error(f"Ticket channel pool update failed: {e}")
+
+    @commands.command()
+    @commands.has_any_role("Admin", "Moderator")
+    async def ticketstats(self, ctx):
+        embed = discord.Embed(title="Ticket Creation", color=0x7289da)
+        for stage, stats in self.creation_stats.items():
+            embed.add_field(
+                name=stage.title(),
+                value=(
+                    f"Samples: {stats.processed}\n"
+                    f"p50: {stats.percentile(50) * 1000:.0f}ms\n"
+                    f"p95: {stats.percentile(95) * 1000:.0f}ms"
+                )
+            )
+        embed.add_field(name="Failed", value=self.creation_stats["total"].errors)
+        embed.add_field(
+            name="Channel Pool",
+            value=f"{len(self.channel_pool)}/{self.TICKET_POOL_SIZE}" if self.TICKET_POOL_SIZE else "Disabled"
+        )
+        await ctx.send(embed=embed)
+
     async def handle_claim(self, interaction, ticket_id):
         try:
             ticket = self.tickets.get(ticket_id)
@@ -292,7 +511,7 @@ class Tickets(commands.Cog):
                 )
 
             ticket["claimed_by"] = interaction.user.id
-            self.save_data()
+            await self.store.update(ticket_id, claimed_by=interaction.user.id)
             
             await interaction.response.send_message(
                 f"Ticket claimed by {interaction.user.mention}",
@@ -300,7 +519,7 @@ class Tickets(commands.Cog):
             )
             
         except Exception as e:
-            self.bot.logger.error(f"Ticket claim error: {e}")
+            logger.error(f"Ticket claim error: {e}")
             await interaction.response.send_message(
                 "Failed to claim ticket.",
                 ephemeral=True
@@ -318,31 +537,58 @@ class Tickets(commands.Cog):
                 )
 
             # Update ticket data
-            ticket.update({
+            closed = {
                 "closed_by": interaction.user.id,
                 "closed_at": datetime.datetime.now().isoformat(),
                 "status": "closed",
                 "close_reason": reason
-            })
-            self.save_data()
+            }
+            ticket.update(closed)
 
-            # Generate transcript
+            # Generate transcript; the upload finishes in the background
+            self.ticket_channels.pop(ticket["channel_id"], None)
             transcript = await self.generate_transcript(ticket_id)
-            transcript_url = await self.upload_transcript(ticket_id, transcript)
+            if not transcript:
+                # Keep the ticket open so its channel and log aren't lost
+                self.reopen_ticket(ticket_id, closed)
+                return await interaction.followup.send(
+                    "Couldn't generate the transcript, so the ticket is still open. "
+                    "Please try again or contact admin.",
+                    ephemeral=True
+                )
+
+            try:
+                await self.store.archive(ticket_id, **closed)
+            except Exception:
+                # Nothing was archived, so the ticket is still open
+                self.reopen_ticket(ticket_id, closed)
+                os.remove(transcript)
+                raise
+            self.tickets.pop(ticket_id, None)
+            self.transcript_log.remove(ticket_id)
+            upload = self.upload_transcript(ticket_id, transcript)
             
             # Send to transcripts channel
             logs_channel = self.bot.get_channel(self.TRANSCRIPTS_CHANNEL_ID)
+            log_message = None
+            embed = discord.Embed(
+                title=f"Ticket #{ticket_id} Closed",
+                description=f"**Reason:** {reason}",
+                color=discord.Color.orange()
+            )
+            embed.add_field(name="Creator", value=f"<@{ticket['creator']}>")
+            embed.add_field(name="Closer", value=interaction.user.mention)
+            if upload:
+                embed.add_field(name="Transcript", value="Uploading...", inline=False)
             if logs_channel:
-                embed = discord.Embed(
-                    title=f"Ticket #{ticket_id} Closed",
-                    description=f"**Reason:** {reason}",
-                    color=discord.Color.orange()
+                log_message = await logs_channel.send(embed=embed)
+
+            if upload:
+                self.run_in_background(
+                    self.finish_transcript_upload(upload, transcript, log_message, embed)
                 )
-                embed.add_field(name="Creator", value=f"<@{ticket['creator']}>")
-                embed.add_field(name="Closer", value=interaction.user.mention)
-                if transcript_url:
-                    embed.add_field(name="Transcript", value=transcript_url, inline=False)
-                await logs_channel.send(embed=embed)
+            else:
+                os.remove(transcript)
 
             # Delete ticket channel
             channel = self.bot.get_channel(ticket["channel_id"])
@@ -355,109 +601,277 @@ class Tickets(commands.Cog):
             )
 
         except Exception as e:
-            self.bot.logger.error(f"Ticket closure error: {e}")
+            logger.error(f"Ticket closure error: {e}")
             await interaction.followup.send(
                 "Failed to close ticket. Please contact admin.",
                 ephemeral=True
             )
 
-    async def generate_transcript(self, ticket_id):
+    def reopen_ticket(self, ticket_id, closed):
+        """Undoes the in-memory part of a close that couldn't finish."""
+        ticket = self.tickets[ticket_id]
+        for key in closed:
+            ticket.pop(key, None)
+        ticket["status"] = "open"
+        self.ticket_channels[ticket["channel_id"]] = ticket_id
+
+    async def get_ticket(self, ticket_id):
+        """Open tickets come from memory; closed ones are read from the archive on demand."""
+        return self.tickets.get(ticket_id) or await self.store.get(ticket_id)
+
+    @commands.command()
+    @commands.has_any_role("Admin", "Moderator")
+    async def ticket(self, ctx, ticket_id: int):
+        ticket = await self.get_ticket(str(ticket_id))
+        if not ticket:
+            return await ctx.send(f"Ticket #{ticket_id} not found.")
+
+        embed = discord.Embed(
+            title=f"Ticket #{ticket_id} ({ticket['status']})",
+            color=discord.Color.green() if ticket["status"] == "open" else discord.Color.orange()
+        )
+        embed.add_field(name="Type", value=ticket["type"])
+        embed.add_field(name="Creator", value=f"<@{ticket['creator']}>")
+        embed.add_field(name="Opened", value=ticket["created_at"][:16].replace("T", " "))
+        if ticket["claimed_by"]:
+            embed.add_field(name="Claimed by", value=f"<@{ticket['claimed_by']}>")
+        if ticket["closed_by"]:
+            embed.add_field(name="Closed by", value=f"<@{ticket['closed_by']}>")
+            embed.add_field(name="Closed", value=ticket["closed_at"][:16].replace("T", " "))
+        if ticket.get("close_reason"):
+            embed.add_field(name="Reason", value=ticket["close_reason"], inline=False)
+        await ctx.send(embed=embed)
+
+    @app_commands.command(name="ticket_search", description="Search closed ticket transcripts")
+    @app_commands.describe(
+        query='Words, "exact phrases", AND / OR / NOT, prefix*, participants:name',
+        creator="Only tickets opened by this member",
+        after="Opened on or after (YYYY-MM-DD)",
+        before="Opened before (YYYY-MM-DD)",
+        page="Results page"
+    )
+    @app_commands.checks.has_any_role("Admin", "Moderator")
+    async def ticket_search(self, interaction: discord.Interaction,
+                            query: str,
+                            creator: discord.User = None,
+                            after: str = None,
+                            before: str = None,
+                            page: app_commands.Range[int, 1] = 1):
         try:
-            ticket = self.tickets[ticket_id]
-            channel = self.bot.get_channel(ticket["channel_id"])
-            
-            if not channel:
-                return None
-
-            messages = []
-            users = {}
-            async for message in channel.history(oldest_first=True):
-                users[str(message.author.id)] = message.author.name
-                messages.append({
-                    "author": message.author.name,
-                    "content": message.content,
-                    "timestamp": message.created_at.strftime("%Y-%m-%d %H:%M"),
-                    "embeds": [embed.to_dict() for embed in message.embeds]
-                })
-
-            template = env.from_string(open("transcript_template.html").read())
-            return template.render(
-                ticket_id=ticket_id,
-                messages=messages,
-                users=users
+            for date in (after, before):
+                if date:
+                    datetime.datetime.strptime(date, "%Y-%m-%d")
+        except ValueError:
+            return await interaction.response.send_message(
+                "❌ Invalid date format. Use YYYY-MM-DD",
+                ephemeral=True
             )
-            
-        except Exception as e:
-            self.bot.logger.error(f"Transcript generation failed: {e}")
-            return None
-
-    async def upload_transcript(self, ticket_id, content):
-        if not content or not self.GITHUB_TOKEN:
-            return None
 
         try:
-            headers = {
-                "Authorization": f"Bearer {self.GITHUB_TOKEN}",
-                "Accept": "application/vnd.github+json"
-            }
-            
-            data = {
-                "message": f"Add transcript for ticket {ticket_id}",
-                "content": base64.b64encode(content.encode()).decode(),
-                "branch": "main"
-            }
+            total, results = await self.search_index.search(
+                query,
+                creator=creator.id if creator else None,
+                after=after,
+                before=before,
+                page=page
+            )
+        except ValueError:
+            return await interaction.response.send_message(
+                '❌ Invalid query. Example: refund AND "ban appeal" NOT spam',
+                ephemeral=True
+            )
+
+        if not results:
+            return await interaction.response.send_message("No matching tickets.", ephemeral=True)
 
-            response = requests.put(
-                f"https://api.github.com/repos/{self.GITHUB_REPO}/contents/transcripts/{ticket_id}.html",
-                headers=headers,
-                json=data
+        embed = discord.Embed(title=f"Ticket search: {query}"[:256], color=discord.Color.blue())
+        for result in results:
+            embed.add_field(
+                name=f"#{result.ticket_id} · {result.type} · {(result.created_at or '')[:10]}",
+                value=f"<@{result.creator}>: {result.snippet}"[:1024],
+                inline=False
             )
+        embed.set_footer(text=f"Page {page}/{(total + 9) // 10} · {total} tickets")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
 
-            if response.status_code in [200, 201]:
-                return f"https://github.com/{self.GITHUB_REPO}/blob/main/transcripts/{ticket_id}.html"
-            return None
-            
-        except Exception as e:
-            self.bot.logger.error(f"GitHub upload failed: {e}")
-            return None
+    @ticket_search.error
+    async def ticket_search_error(self, interaction: discord.Interaction, error):
+        if isinstance(error, app_commands.MissingAnyRole):
+            await interaction.response.send_message("You don't have permission for this!", ephemeral=True)
+        else:
+            await interaction.response.send_message(f"Error: {str(error)}", ephemeral=True)
 
+    # Transcript capture
     @commands.Cog.listener()
-    async def on_ready(self):
-        await self.reattach_ticket_views()
+    async def on_message(self, message):
+        ticket_id = self.ticket_channels.get(message.channel.id)
+        if ticket_id is None:
+            return
+        if ticket_id in self.backfilling:
+            self.backfilling[ticket_id].append(message)
+        else:
+            self.transcript_log.record_message(ticket_id, message)
 
-    async def reattach_ticket_views(self):
-        for ticket_id in self.tickets:
-            channel = self.bot.get_channel(self.tickets[ticket_id]["channel_id"])
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload):
+        ticket_id = self.ticket_channels.get(payload.channel_id)
+        if ticket_id is not None:
+            self.transcript_log.record_edit(ticket_id, payload.message_id, payload.data)
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload):
+        ticket_id = self.ticket_channels.get(payload.channel_id)
+        if ticket_id is not None:
+            self.transcript_log.record_delete(ticket_id, payload.message_id)
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload):
+        ticket_id = self.ticket_channels.get(payload.channel_id)
+        if ticket_id is not None:
+            for message_id in payload.message_ids:
+                self.transcript_log.record_delete(ticket_id, message_id)
+
+    async def backfill_transcript(self, ticket_id, channel):
+        """Records messages newer than the last one in the ticket's log.
+
+        Messages arriving live meanwhile are held back and appended afterwards,
+        so the log stays in message order.
+        """
+        self.backfilling[ticket_id] = []
+        try:
+            last_id = self.transcript_log.last_message_id(ticket_id)
+            after = discord.Object(id=last_id) if last_id else None
+            async for message in channel.history(limit=None, after=after, oldest_first=True):
+                self.transcript_log.record_message(ticket_id, message)
+        finally:
+            last_id = self.transcript_log.last_message_id(ticket_id) or 0
+            for message in self.backfilling.pop(ticket_id):
+                if message.id > last_id:
+                    self.transcript_log.record_message(ticket_id, message)
+
+    async def reconcile_transcripts(self):
+        # Only fills the gap since the last recorded message, usually nothing
+        for channel_id, ticket_id in list(self.ticket_channels.items()):
+            channel = self.bot.get_channel(channel_id)
             if not channel:
                 continue
+            try:
+                await self.backfill_transcript(ticket_id, channel)
+            except discord.HTTPException as e:
+                logger.error(f"Transcript backfill failed for ticket {ticket_id}: {e}")
 
-            view = View(timeout=None)
-            
-            claim_btn = Button(
-                style=discord.ButtonStyle.primary,
-                label="Claim Ticket",
-                custom_id=f"claim_{ticket_id}"
-            )
-            close_btn = Button(
-                style=discord.ButtonStyle.danger,
-                label="Close Ticket",
-                custom_id=f"close_{ticket_id}"
-            )
+    async def generate_transcript(self, ticket_id):
+        """Renders the ticket's recorded log to a temp file and returns its path.
 
-            async def claim_callback(interaction):
-                await self.handle_claim(interaction, ticket_id)
+        The log is folded in two passes (edits and deletes first, then the
+        messages in batches), and rendered output and the plain text for the
+        search index are written to temp files as they are produced, so memory
+        does not grow with the length of the ticket.
+        """
+        try:
+            ticket = self.tickets[ticket_id]
+            channel = self.bot.get_channel(ticket["channel_id"])
+            log = self.transcript_log
 
-            async def close_callback(interaction):
-                await interaction.response.send_modal(
-                    self.CloseTicketModal(self, ticket_id)
-                
-            claim_btn.callback = claim_callback
-            close_btn.callback = close_callback
-            
-            view.add_item(claim_btn)
-            view.add_item(close_btn)
+            # Tickets opened before capture existed have no log yet
+            if log.last_message_id(ticket_id) is None:
+                if not channel:
+                    return None
+                await self.backfill_transcript(ticket_id, channel)
+
+            edits, deleted = await asyncio.to_thread(log.changes, ticket_id)
+            batches = log.read_batches(ticket_id, edits, deleted)
+
+            # Filled in as messages stream past; authors and mentioned users
+            # are added before the message that needs them is rendered
+            users = {}
+            mentions = MentionResolver(users, channel.guild if channel else None)
+            # Plain text of the transcript for the search index
+            text = tempfile.TemporaryFile("w+", encoding="utf-8")
+
+            async def iter_messages():
+                while True:
+                    batch = await asyncio.to_thread(next, batches, None)
+                    if batch is None:
+                        return
+                    for record in batch:
+                        users[str(record["a"])] = record["n"]
+                        users.update(record["u"])
+                        text.write(f"{record['n']}: {mentions.replace(record['c'])}\n")
+                        created_at = datetime.datetime.fromtimestamp(record["t"], datetime.timezone.utc)
+                        yield {
+                            "author": record["n"],
+                            "content": record["c"],
+                            "timestamp": created_at.strftime("%Y-%m-%d %H:%M"),
+                            "embeds": record["e"]
+                        }
+
+            with text:
+                template = env.get_template("transcript_template.html")
+                fd, path = tempfile.mkstemp(prefix=f"transcript-{ticket_id}-", suffix=".html")
+                try:
+                    with open(fd, "w", encoding="utf-8", buffering=1 << 16) as f:
+                        async for chunk in template.generate_async(
+                            ticket_id=ticket_id,
+                            messages=iter_messages(),
+                            users=mentions
+                        ):
+                            f.write(chunk)
+                except Exception:
+                    os.remove(path)
+                    raise
+
+                try:
+                    text.seek(0)
+                    await self.search_index.add(
+                        ticket_id,
+                        ticket,
+                        [*users.values(), *users.keys()],
+                        chunk_lines(text)
+                    )
+                except Exception as e:
+                    logger.error(f"Indexing ticket {ticket_id} failed: {e}")
+            return path
             
-            self.bot.add_view(view, message_id=int(ticket_id))
+        except Exception as e:
+            logger.error(f"Transcript generation failed: {e}")
+            return None
+
+    def run_in_background(self, coro):
+        task = asyncio.create_task(coro)
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_task_done)
+        return task
+
+    def background_task_done(self, task):
+        self.background_tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error(f"Background ticket task failed: {task.exception()}")
+
+    def upload_transcript(self, ticket_id, path):
+        """Queues the transcript for upload; returns a future resolving to its URL."""
+        if not path or not self.uploader:
+            return None
+        return self.uploader.submit(f"{ticket_id}.html", path)
+
+    async def finish_transcript_upload(self, upload, path, log_message, embed):
+        try:
+            transcript_url = await upload
+        finally:
+            os.remove(path)
+
+        if not log_message:
+            return
+        embed.set_field_at(
+            len(embed.fields) - 1,
+            name="Transcript",
+            value=transcript_url or "Upload failed",
+            inline=False
+        )
+        try:
+            await log_message.edit(embed=embed)
+        except discord.HTTPException as e:
+            logger.error(f"Transcript link update failed: {e}")
 
 async def setup(bot):
     await bot.add_cog(Tickets(bot))
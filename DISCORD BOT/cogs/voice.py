@@ -1,9 +1,24 @@
 import discord
+from discord import app_commands
 from discord.ext import commands, tasks
 import json
 import os
-import asyncio
-from datetime import datetime, timedelta
+import sqlite3
+import time
+from typing import Literal
+from utils.role_reconciler import RoleReconciler
+from utils.scheduler import DeadlineScheduler
+from utils.study_stats import CHANNEL, MEMBER, StudyStats
+
+def format_duration(seconds):
+    hours, minutes = divmod(int(seconds) // 60, 60)
+    return f"{hours}h {minutes:02d}m" if hours else f"{minutes}m"
+
+def format_interval(seconds):
+    """Spells out a countdown for member-facing messages: ``60 seconds``, ``5 minutes``."""
+    if seconds < 120 or seconds % 60:
+        return f"{seconds} seconds"
+    return f"{seconds // 60} minutes"
 
 class Voice(commands.Cog):
     def __init__(self, bot):
@@ -13,9 +28,37 @@ class Voice(commands.Cog):
         self.monitored_vcs = set()
         self.AFK_VC_ID = int(os.getenv("AFK_VC_ID"))
         self.ROLE_ID = int(os.getenv("COMPLIANCE_ROLE_ID"))
-        
+        self.COMPLIANCE_INTERVAL = int(os.getenv("COMPLIANCE_INTERVAL", 60))
+        self.COMPLIANCE_STATE_FILE = "voice_compliance.json"
+
+        # One deadline per non-compliant member; nothing runs while everyone complies.
+        # Pending checks (with their warn counts) are snapshotted to disk, so a
+        # restart resumes escalation instead of starting over
+        self.scheduler = DeadlineScheduler(self.run_compliance_check, self.COMPLIANCE_STATE_FILE)
+        # Camera/stream role edits are debounced so flapping costs one API call
+        self.roles = RoleReconciler(
+            window=float(os.getenv("ROLE_DEBOUNCE_SECONDS", 2)),
+            reason="Camera/stream status"
+        )
+        self.ignored_events = 0
+
+        # Study time: member_id -> (channel_id, since, on_camera) for everyone in a monitored VC
+        self.sessions = {}
+        self.study_stats = StudyStats(os.getenv("STUDY_STATS_DB", "study_stats.db"))
+
         self.load_monitored_vcs()
-        self.check_compliance.start()
+
+    async def cog_load(self):
+        await self.study_stats.open()
+        if self.bot.is_ready():
+            await self.on_ready()
+
+    async def cog_unload(self):
+        self.flush_study_stats.cancel()
+        await self.scheduler.stop()
+        await self.roles.stop()
+        self.checkpoint_sessions()
+        await self.study_stats.close()
 
     def load_monitored_vcs(self):
         try:
@@ -33,61 +76,205 @@ class Voice(commands.Cog):
         if member.bot:
             return
 
+        # Mute/deafen and other toggles change nothing we track
+        if (before.channel == after.channel
+                and before.self_stream == after.self_stream
+                and before.self_video == after.self_video):
+            self.ignored_events += 1
+            return
+
+        self.track_session(member.id, after.channel, bool(after.self_stream or after.self_video))
+
         # Handle role assignment based on stream/camera
-        await self.handle_role_assignment(member, after)
+        self.handle_role_assignment(member, after)
         
         # Compliance tracking
         await self.handle_compliance_tracking(member, before, after)
 
-    async def handle_role_assignment(self, member, after):
+    def handle_role_assignment(self, member, after):
         role = member.guild.get_role(self.ROLE_ID)
         if not role:
             return
 
-        if after.channel and (after.self_stream or after.self_video):
-            if role not in member.roles:
-                await member.add_roles(role)
-        elif role in member.roles:
-            await member.remove_roles(role)
+        self.roles.set(member, role, bool(after.channel and (after.self_stream or after.self_video)))
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before, after):
+        if before.roles != after.roles:
+            self.roles.observe(after)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member):
+        self.roles.forget(member)
+        self.stop_tracking(member.id)
+        self.track_session(member.id, None, False)
 
     async def handle_compliance_tracking(self, member, before, after):
-        # Join monitored VC
-        if after.channel and after.channel.id in self.monitored_vcs:
-            if not before.channel or before.channel.id not in self.monitored_vcs:
-                self.user_compliance[member.id] = {
-                    "warn_count": 0,
-                    "monitoring": True
-                }
-                await self.check_user_compliance(member)
-                asyncio.create_task(self.schedule_compliance_check(member))
+        was_monitored = before.channel and before.channel.id in self.monitored_vcs
+        is_monitored = after.channel and after.channel.id in self.monitored_vcs
 
         # Leave monitored VC
-        if before.channel and before.channel.id in self.monitored_vcs:
-            if not after.channel or after.channel.id not in self.monitored_vcs:
-                self.user_compliance.pop(member.id, None)
+        if not is_monitored:
+            if was_monitored:
+                self.stop_tracking(member.id)
+            return
 
-    async def schedule_compliance_check(self, member):
-        await asyncio.sleep(60)
-        if member.id in self.user_compliance:
+        # Join monitored VC
+        if not was_monitored:
+            self.user_compliance[member.id] = {
+                "warn_count": 0,
+                "monitoring": True
+            }
             await self.check_user_compliance(member)
+            return
 
-    @tasks.loop(seconds=60)
-    async def check_compliance(self):
-        guild = self.bot.get_guild(int(os.getenv("GUILD_ID")))
-        role = guild.get_role(self.ROLE_ID)
-        
-        for user_id, status in list(self.user_compliance.items()):
-            member = guild.get_member(user_id)
-            if not member:
-                continue
-
-            if member.voice and member.voice.channel and member.voice.channel.id in self.monitored_vcs:
-                if not (member.voice.self_stream or member.voice.self_video):
-                    await self.handle_non_compliance(member)
-                else:
-                    status["warn_count"] = 0
-            else:
-                self.user_compliance.pop(user_id, None)
+        status = self.user_compliance.setdefault(member.id, {"warn_count": 0, "monitoring": True})
+        if after.self_stream or after.self_video:
+            # Camera or stream turned on: drop the pending check
+            status["warn_count"] = 0
+            self.scheduler.cancel(str(member.id))
+        elif str(member.id) not in self.scheduler:
+            # Camera or stream turned off: first check one interval from now
+            self.schedule_check(member)
+
+    def schedule_check(self, member):
+        status = self.user_compliance.get(member.id, {})
+        self.scheduler.schedule_in(
+            str(member.id),
+            self.COMPLIANCE_INTERVAL,
+            {"guild": member.guild.id, "warns": status.get("warn_count", 0)}
+        )
+
+    def stop_tracking(self, member_id):
+        self.user_compliance.pop(member_id, None)
+        self.scheduler.cancel(str(member_id))
+
+    async def run_compliance_check(self, key, payload):
+        guild = self.bot.get_guild(payload["guild"])
+        member = guild.get_member(int(key)) if guild else None
+        if not member:
+            self.user_compliance.pop(int(key), None)
+            return
+        await self.check_user_compliance(member)
+
+    # Startup / reconnect
+    @commands.Cog.listener()
+    async def on_ready(self):
+        self.rebuild_state()
+        # Saved deadlines only fire once the state they act on is rebuilt
+        self.scheduler.start()
+        if not self.flush_study_stats.is_running():
+            self.flush_study_stats.start()
+
+    @commands.Cog.listener()
+    async def on_resumed(self):
+        self.rebuild_state()
+
+    def rebuild_state(self):
+        """Re-derives tracking and roles from the cached voice states in one pass.
+
+        Picks up members who joined while the bot was offline, restores warn
+        counts from saved deadlines, and drops anyone who left meanwhile.
+        """
+        in_monitored = set()
+        now = time.time()
+        for guild in self.bot.guilds:
+            role = guild.get_role(self.ROLE_ID)
+            on_camera = set()
+            for channel in guild.voice_channels:
+                monitored = channel.id in self.monitored_vcs
+                for member_id, voice in channel.voice_states.items():
+                    member = guild.get_member(member_id)
+                    if not member or member.bot:
+                        continue
+                    compliant = bool(voice.self_stream or voice.self_video)
+                    if compliant:
+                        on_camera.add(member_id)
+                    if role:
+                        self.roles.set(member, role, compliant)
+                    if monitored:
+                        in_monitored.add(member_id)
+                        self.restore_tracking(member, compliant)
+                        session = self.sessions.get(member_id)
+                        if not session or session[0] != channel.id or session[2] != compliant:
+                            self.track_session(member_id, channel, compliant, now)
+
+            # Role holders who left voice or turned their camera off while we were away
+            if role:
+                for member in role.members:
+                    if member.id not in on_camera:
+                        self.roles.set(member, role, False)
+
+        for member_id in list(self.user_compliance):
+            if member_id not in in_monitored:
+                self.stop_tracking(member_id)
+        for key in list(self.scheduler.entries):
+            if int(key) not in in_monitored:
+                self.scheduler.cancel(key)
+        for member_id in list(self.sessions):
+            if member_id not in in_monitored:
+                self.track_session(member_id, None, False, now)
+
+    def restore_tracking(self, member, compliant):
+        key = str(member.id)
+        status = self.user_compliance.get(member.id)
+        if status is None:
+            saved = self.scheduler.payload(key) or {}
+            status = self.user_compliance[member.id] = {
+                "warn_count": saved.get("warns", 0),
+                "monitoring": True
+            }
+        if compliant:
+            status["warn_count"] = 0
+            self.scheduler.cancel(key)
+        elif key not in self.scheduler:
+            self.schedule_check(member)
+
+    # Study time
+    def track_session(self, member_id, channel, on_camera, now=None):
+        """Credits the member's current session and starts the next one, if any."""
+        now = now if now is not None else time.time()
+        session = self.sessions.pop(member_id, None)
+        if session:
+            channel_id, since, was_on_camera = session
+            self.study_stats.credit(member_id, channel_id, since, now, was_on_camera)
+        if channel and channel.id in self.monitored_vcs:
+            self.sessions[member_id] = (channel.id, now, on_camera)
+
+    def checkpoint_sessions(self):
+        """Credits every open session up to now without ending it."""
+        now = time.time()
+        for member_id, (channel_id, since, on_camera) in self.sessions.items():
+            self.study_stats.credit(member_id, channel_id, since, now, on_camera)
+            self.sessions[member_id] = (channel_id, now, on_camera)
+
+    @tasks.loop(minutes=5)
+    async def flush_study_stats(self):
+        # A crash loses at most one interval of study time
+        self.checkpoint_sessions()
+        try:
+            await self.study_stats.flush()
+        except sqlite3.Error as e:
+            print(f"Failed to save study stats: {e}")
+
+    async def check_user_compliance(self, member):
+        status = self.user_compliance.get(member.id)
+        if status is None:
+            return
+
+        voice = member.voice
+        if not (voice and voice.channel and voice.channel.id in self.monitored_vcs):
+            self.stop_tracking(member.id)
+            return
+
+        if voice.self_stream or voice.self_video:
+            status["warn_count"] = 0
+            return
+
+        await self.handle_non_compliance(member)
+        # Escalate on this member's own clock until they comply, leave or get moved
+        if member.id in self.user_compliance:
+            self.schedule_check(member)
 
     async def handle_non_compliance(self, member):
         status = self.user_compliance[member.id]
@@ -96,10 +283,13 @@ class Voice(commands.Cog):
         if status["warn_count"] == 1:
             await self.send_warning(member, "First warning: Please turn on camera/screen share")
         elif status["warn_count"] == 2:
-            await self.send_warning(member, "Final warning: Turn on camera within 60 seconds")
+            await self.send_warning(
+                member,
+                f"Final warning: Turn on camera within {format_interval(self.COMPLIANCE_INTERVAL)}"
+            )
         elif status["warn_count"] >= 3:
             await self.move_to_afk(member)
-            self.user_compliance.pop(member.id, None)
+            self.stop_tracking(member.id)
 
     async def send_warning(self, member, message):
         try:
@@ -133,9 +323,84 @@ class Voice(commands.Cog):
         
         self.save_monitored_vcs()
 
-    @check_compliance.before_loop
-    async def before_check_compliance(self):
-        await self.bot.wait_until_ready()
+    @commands.command()
+    @commands.has_permissions(manage_channels=True)
+    async def voicestats(self, ctx):
+        embed = discord.Embed(title="Voice Compliance", color=0x7289da)
+        embed.add_field(name="Tracked Members", value=len(self.user_compliance))
+        embed.add_field(name="Pending Checks", value=len(self.scheduler))
+        embed.add_field(name="Checks Run", value=self.scheduler.fired)
+        embed.add_field(
+            name="Role Updates",
+            value=(
+                f"Issued: {self.roles.issued}\n"
+                f"Suppressed: {self.roles.suppressed}\n"
+                f"Pending: {len(self.roles.pending)} / Errors: {self.roles.errors}"
+            )
+        )
+        embed.add_field(name="Ignored Voice Events", value=self.ignored_events)
+        embed.add_field(name="Open Study Sessions", value=len(self.sessions))
+        await ctx.send(embed=embed)
+
+    @app_commands.command(name="leaderboard", description="Top study times in the monitored voice channels")
+    @app_commands.describe(
+        period="today (UTC), week (last 7 days) or all time",
+        metric="camera: time with camera or stream on, voice: any time in a study VC",
+        scope="Rank members or channels"
+    )
+    async def leaderboard(self, interaction: discord.Interaction,
+                          period: Literal["today", "week", "all"] = "week",
+                          metric: Literal["camera", "voice"] = "camera",
+                          scope: Literal["members", "channels"] = "members"):
+        self.checkpoint_sessions()
+        kind = MEMBER if scope == "members" else CHANNEL
+        top = self.study_stats.leaderboard(kind, period, metric)
+        if not top:
+            return await interaction.response.send_message("No study time recorded yet.", ephemeral=True)
+
+        mention = "<@{}>" if kind == MEMBER else "<#{}>"
+        lines = [
+            f"**{rank}.** {mention.format(key)} - {format_duration(seconds)}"
+            for rank, (key, seconds) in enumerate(top, start=1)
+        ]
+        titles = {"today": "Today", "week": "Last 7 Days", "all": "All Time"}
+        embed = discord.Embed(
+            title=f"Study Leaderboard - {titles[period]}",
+            description="\n".join(lines),
+            color=0x7289da
+        )
+        embed.set_footer(text="Camera/stream time" if metric == "camera" else "Time in study VCs")
+        await interaction.response.send_message(embed=embed)
+
+    @app_commands.command(name="mystats", description="Your study time in the monitored voice channels")
+    @app_commands.describe(member="Show someone else's stats")
+    async def mystats(self, interaction: discord.Interaction, member: discord.Member = None):
+        member = member or interaction.user
+        self.checkpoint_sessions()
+        summary = self.study_stats.summary(MEMBER, member.id)
+        hours = await self.study_stats.hours(MEMBER, member.id)
+
+        embed = discord.Embed(title=f"Study Stats - {member.display_name}", color=0x7289da)
+        for period, name in (("today", "Today"), ("week", "Last 7 Days"), ("all", "All Time")):
+            voice, camera, rank = summary[period]
+            embed.add_field(
+                name=name,
+                value=(
+                    f"Camera/stream: {format_duration(camera)}\n"
+                    f"In VC: {format_duration(voice)}\n"
+                    f"Rank: {f'#{rank}' if rank else '-'}"
+                )
+            )
+
+        camera_hours = hours[24:]
+        busiest = sorted((h for h in range(24) if camera_hours[h]), key=lambda h: camera_hours[h], reverse=True)[:3]
+        if busiest:
+            embed.add_field(
+                name="Busiest Hours (UTC, last 7 days)",
+                value="\n".join(f"{h:02d}:00 - {format_duration(camera_hours[h])}" for h in busiest),
+                inline=False
+            )
+        await interaction.response.send_message(embed=embed)
 
 async def setup(bot):
     await bot.add_cog(Voice(bot))
\ No newline at end of file
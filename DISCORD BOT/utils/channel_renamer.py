@@ -0,0 +1,152 @@
+import asyncio
+import collections
+import time
+
+import discord
+
+from utils.scheduler import DeadlineScheduler
+
+
+class ChannelRenamer:
+    """Applies queued channel renames within Discord's rate limits.
+
+    Discord allows ``limit`` renames per channel every ``per`` seconds (2 per
+    10 minutes at the time of writing) and answers anything faster with a 429
+    that discord.py sleeps through. Each channel's recent renames are kept as
+    a bucket, and a rename only fires once its bucket has room. Across
+    channels, renames are at least ``spacing`` seconds apart to stay clear of
+    the global limit.
+
+    ``request`` only records the wanted name, so repeated requests for one
+    channel collapse into a single edit of the latest name. Each edit runs
+    in its own task, so one channel waiting on Discord never holds up the
+    others. Failed edits are retried with exponential backoff, up to
+    ``max_retries`` times.
+    """
+
+    def __init__(self, get_channel, limit=2, per=600, spacing=1.0,
+                 max_retries=5, retry_delay=30, reason=None, clock=time.time):
+        self.get_channel = get_channel
+        self.limit = limit
+        self.per = per
+        self.spacing = spacing
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.reason = reason
+        self.clock = clock
+        self.scheduler = DeadlineScheduler(self._due, clock=clock)
+        self.wanted = {}
+        self.history = {}
+        self.attempts = {}
+        self.in_flight = {}
+        self.next_global = 0.0
+        self.renamed = 0
+        self.skipped = 0
+        self.retried = 0
+        self.failed = 0
+
+    def start(self):
+        self.scheduler.start()
+
+    async def stop(self):
+        await self.scheduler.stop()
+        for task in self.in_flight.values():
+            task.cancel()
+        await asyncio.gather(*self.in_flight.values(), return_exceptions=True)
+
+    def next_slot(self, channel_id):
+        """Earliest time ``channel_id``'s bucket has room for another rename (0 if it has room now)."""
+        recent = self.history.get(channel_id)
+        if not recent or len(recent) < self.limit:
+            return 0.0
+        return recent[0] + self.per
+
+    def request(self, channel_id, name, at=None):
+        """Queues a rename of ``channel_id`` to ``name`` no earlier than ``at``.
+
+        Returns the time the rename is expected to go out.
+        """
+        self.wanted[channel_id] = name
+        self.attempts.pop(channel_id, None)
+        due = max(at if at is not None else self.clock(), self.next_slot(channel_id))
+        if channel_id not in self.in_flight:
+            self.scheduler.schedule(str(channel_id), due)
+        return due
+
+    def cancel(self, channel_id):
+        self.wanted.pop(channel_id, None)
+        self.attempts.pop(channel_id, None)
+        self.scheduler.cancel(str(channel_id))
+
+    async def _due(self, key, payload):
+        channel_id = int(key)
+        if channel_id in self.in_flight or channel_id not in self.wanted:
+            # An in-flight edit re-queues the latest name when it finishes
+            return
+
+        now = self.clock()
+        slot = self.next_slot(channel_id)
+        if slot > now:
+            self.scheduler.schedule(key, slot)
+            return
+
+        if not (payload and payload.get("reserved")):
+            # Hand out global slots in order instead of letting every due channel retry at once
+            start = max(now, self.next_global)
+            self.next_global = start + self.spacing
+            if start > now:
+                self.scheduler.schedule(key, start, {"reserved": True})
+                return
+
+        self.in_flight[channel_id] = asyncio.create_task(self._rename(channel_id))
+
+    async def _rename(self, channel_id):
+        name = self.wanted[channel_id]
+        try:
+            channel = self.get_channel(channel_id)
+            if not channel or channel.name == name:
+                self.skipped += 1
+                self._done(channel_id, name)
+                return
+
+            recent = self.history.setdefault(channel_id, collections.deque(maxlen=self.limit))
+            recent.append(self.clock())
+            try:
+                await channel.edit(name=name, reason=self.reason)
+            except (discord.Forbidden, discord.NotFound) as e:
+                self.failed += 1
+                print(f"Can't rename channel {channel_id}: {e}")
+                self._done(channel_id, name)
+                return
+            except discord.RateLimited as e:
+                self._retry(channel_id, e.retry_after, e)
+                return
+            except (discord.HTTPException, asyncio.TimeoutError, OSError) as e:
+                attempts = self.attempts.get(channel_id, 0)
+                self._retry(channel_id, self.retry_delay * 2 ** attempts, e)
+                return
+
+            self.renamed += 1
+            self._done(channel_id, name)
+        finally:
+            self.in_flight.pop(channel_id, None)
+            # The wanted name changed while the edit was in flight
+            if channel_id in self.wanted and str(channel_id) not in self.scheduler:
+                self.scheduler.schedule(str(channel_id), max(self.clock(), self.next_slot(channel_id)))
+
+    def _done(self, channel_id, name):
+        if self.wanted.get(channel_id) == name:
+            del self.wanted[channel_id]
+            self.attempts.pop(channel_id, None)
+
+    def _retry(self, channel_id, delay, error):
+        attempts = self.attempts.get(channel_id, 0) + 1
+        if attempts > self.max_retries:
+            self.failed += 1
+            print(f"Giving up renaming channel {channel_id}: {error}")
+            self.wanted.pop(channel_id, None)
+            self.attempts.pop(channel_id, None)
+            return
+        self.attempts[channel_id] = attempts
+        self.retried += 1
+        self.scheduler.schedule(str(channel_id), self.clock() + delay)
@@ -0,0 +1,20 @@
+import json
+
+
+def read_journal(path):
+    """Yields the records of a JSON-lines journal, oldest first.
+
+    A missing file reads as empty. Lines that don't parse are skipped: a
+    crash mid-write can only tear the last one.
+    """
+    try:
+        f = open(path, "r", encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # Torn final line from a crash mid-write
+                continue
@@ -0,0 +1,61 @@
+import re
+from collections import namedtuple
+
+KeywordMatch = namedtuple("KeywordMatch", ["keyword", "start", "end"])
+
+
+def clean_keywords(keywords):
+    """Returns ``keywords`` lowercased, stripped, deduplicated and sorted."""
+    return tuple(sorted({k.strip().lower() for k in keywords if k.strip()}))
+
+
+def trie_pattern(keywords):
+    """Builds a regex source for ``keywords`` with shared prefixes factored out.
+
+    A flat ``a|b|c`` alternation makes the regex engine try every keyword at
+    every position, so its cost grows with the list. Factoring the list into
+    a prefix trie means each position only walks the branches whose first
+    characters actually match. Longer continuations are tried before a
+    keyword that ends at the current node, so "jerk off" still wins over
+    "jerk".
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node):
+        terminal = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        if terminal:
+            return f"(?:{body})?"
+        return body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """Scans text for a list of keywords in a single pass.
+
+    The keywords are compiled once into one trie-shaped regex with word
+    boundaries (see ``trie_pattern``). A matcher never changes after it is
+    built; a new keyword list gets a new matcher.
+    """
+
+    def __init__(self, keywords=()):
+        self.keywords = clean_keywords(keywords)
+        if self.keywords:
+            self.pattern = re.compile(rf"\b(?:{trie_pattern(self.keywords)})\b", re.IGNORECASE)
+        else:
+            self.pattern = re.compile(r"(?!x)x")
+
+    def find_all(self, content):
+        return [
+            KeywordMatch(m.group(0).lower(), m.start(), m.end())
+            for m in self.pattern.finditer(content)
+        ]
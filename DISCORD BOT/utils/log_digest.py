@@ -0,0 +1,130 @@
+import asyncio
+import discord
+
+
+def highlight(content, matches, limit):
+    """Bolds the matched spans of ``content``, truncated to ``limit`` characters."""
+    content = content[:limit]
+    pieces = []
+    cursor = 0
+    for match in sorted(matches, key=lambda m: m.start):
+        start, end = max(match.start, cursor), min(match.end, len(content))
+        if start >= end:
+            continue
+        pieces.append(content[cursor:start])
+        pieces.append(f"**{content[start:end]}**")
+        cursor = end
+    pieces.append(content[cursor:])
+    return "".join(pieces)
+
+
+class AbuseLogAggregator:
+    """Coalesces abuse-log posts into digest embeds during floods.
+
+    Violations are grouped per key (the guild) and per offender. When the log
+    has been quiet for a full window the first violation is flushed on the next
+    loop tick, so normal traffic sees no added latency. While violations keep
+    arriving, at most one post is made per window, with up to
+    ``max_entries`` offenders per digest embed.
+
+    ``send`` is a coroutine taking ``(key, embed)``. Violations with a
+    ``reason`` (spam, raids) are logged by reason instead of by matched terms.
+    """
+
+    def __init__(self, send, window=3.0, max_entries=10):
+        self.send = send
+        self.window = window
+        self.max_entries = max_entries
+        self.pending = {}
+        self.last_sent = {}
+        self.flush_tasks = {}
+        self.posts = 0
+        self.violations = 0
+
+    def add(self, key, message, matches, reason=None):
+        self.violations += 1
+        offenders = self.pending.setdefault(key, {})
+        entry = offenders.get(message.author.id)
+        if entry is None:
+            entry = offenders[message.author.id] = {
+                "mention": message.author.mention,
+                "count": 0,
+                "terms": set(),
+                "reasons": set(),
+                "channels": set(),
+                "sample": message.content,
+                "matches": matches,
+            }
+        entry["count"] += 1
+        entry["terms"].update(match.keyword for match in matches)
+        if reason:
+            entry["reasons"].add(reason)
+        entry["channels"].add(message.channel.id)
+
+        if key not in self.flush_tasks:
+            loop = asyncio.get_running_loop()
+            elapsed = loop.time() - self.last_sent.get(key, float("-inf"))
+            delay = max(self.window - elapsed, 0)
+            self.flush_tasks[key] = asyncio.create_task(self._flush_after(key, delay))
+
+    async def _flush_after(self, key, delay):
+        await asyncio.sleep(delay)
+        offenders = self.pending.pop(key, {})
+        self.flush_tasks.pop(key, None)
+        self.last_sent[key] = asyncio.get_running_loop().time()
+
+        entries = list(offenders.values())
+        for start in range(0, len(entries), self.max_entries):
+            try:
+                await self.send(key, self.build_embed(entries[start:start + self.max_entries]))
+                self.posts += 1
+            except Exception as e:
+                print(f"Abuse log post failed: {e}")
+
+    def build_embed(self, entries):
+        if len(entries) == 1 and entries[0]["count"] == 1:
+            entry = entries[0]
+            if entry["reasons"]:
+                embed = discord.Embed(
+                    title="Spam Detected",
+                    description=f"{entry['mention']} was muted for {', '.join(sorted(entry['reasons']))}",
+                    color=discord.Color.orange()
+                )
+            else:
+                embed = discord.Embed(
+                    title="NSFW Content Detected",
+                    description=f"{entry['mention']} posted restricted content",
+                    color=discord.Color.orange()
+                )
+            embed.add_field(
+                name="Message", value=highlight(entry["sample"], entry["matches"], 500), inline=False
+            )
+            embed.add_field(name="Action", value="Muted + Message Deleted")
+            return embed
+
+        total = sum(entry["count"] for entry in entries)
+        spam_only = all(entry["reasons"] and not entry["terms"] for entry in entries)
+        nsfw_only = not any(entry["reasons"] for entry in entries)
+        embed = discord.Embed(
+            title="Spam Digest" if spam_only else "NSFW Content Digest" if nsfw_only else "Moderation Digest",
+            description=f"{total} messages from {len(entries)} members removed",
+            color=discord.Color.orange()
+        )
+        for entry in entries:
+            channels = ", ".join(f"<#{channel_id}>" for channel_id in entry["channels"])
+            details = []
+            if entry["terms"]:
+                details.append(f"Terms: {', '.join(sorted(entry['terms']))}\n")
+            if entry["reasons"]:
+                details.append(f"Reason: {', '.join(sorted(entry['reasons']))}\n")
+            embed.add_field(
+                name=f"{entry['count']}× message{'s' if entry['count'] != 1 else ''}",
+                value=(
+                    f"{entry['mention']} in {channels}\n"
+                    f"{''.join(details)}"
+                    f"> {highlight(entry['sample'], entry['matches'], 150).replace(chr(10), ' ')}"
+                )[:1024],
+                inline=False
+            )
+        embed.set_footer(text="Muted + Messages Deleted")
+        return embed
@@ -0,0 +1,51 @@
+import re
+
+# User (<@id>, <@!id>), role (<@&id>), channel (<#id>) and custom emoji (<:name:id>, <a:name:id>)
+MENTION_PATTERN = re.compile(r"<(@[!&]?|#)([0-9]+)>|<a?:(\w+):[0-9]+>")
+
+
+class MentionResolver:
+    """Replaces mention tokens in message content with readable names.
+
+    One regex pass per message, each token resolved with dict lookups:
+    ``users`` maps user ID strings to names (it may keep filling up while a
+    transcript streams), roles and channels come from ``guild``'s caches.
+    Resolved tokens are cached for the lifetime of the resolver, which is one
+    transcript. Unknown tokens are left as they are and not cached, so a user
+    seen later in the transcript still resolves.
+    """
+
+    def __init__(self, users, guild=None):
+        self.users = users
+        self.guild = guild
+        self.cache = {}
+
+    def _lookup(self, match):
+        kind, target_id, emoji = match.groups()
+        if emoji:
+            return f":{emoji}:"
+        if kind in ("@", "@!"):
+            name = self.users.get(target_id)
+            return f"@{name}" if name is not None else None
+        if self.guild is None:
+            return None
+        if kind == "@&":
+            role = self.guild.get_role(int(target_id))
+            return f"@{role.name}" if role else None
+        channel = self.guild.get_channel(int(target_id))
+        return f"#{channel.name}" if channel else None
+
+    def _resolve(self, match):
+        token = match.group(0)
+        name = self.cache.get(token)
+        if name is None:
+            name = self._lookup(match)
+            if name is None:
+                return token
+            self.cache[token] = name
+        return name
+
+    def replace(self, content):
+        if not content or "<" not in content:
+            return content
+        return MENTION_PATTERN.sub(self._resolve, content)
@@ -0,0 +1,164 @@
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class StageStats:
+    """Rolling latency samples for one pipeline stage."""
+
+    def __init__(self, size=1024):
+        self.samples = deque(maxlen=size)
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+        self.processed += 1
+
+    def percentile(self, pct):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(int(len(ordered) * pct / 100), len(ordered) - 1)
+        return ordered[index]
+
+
+class ModerationPipeline:
+    """Moves message scanning and moderation actions off the gateway handler.
+
+    Messages go into a bounded scan queue served by a pool of workers. Flagged
+    messages are deleted first, then the member is punished, then the log post
+    is queued. Deletes and punishments are never dropped; when the log queue is
+    full the oldest pending log post is discarded instead.
+
+    ``scan`` is a plain function ``message -> matches``. ``delete``, ``punish``
+    and ``log`` are coroutines taking ``(message, matches, reason)``; ``reason``
+    is None for keyword matches and set for messages passed to ``flag``.
+    """
+
+    STAGES = ("scan", "delete", "punish", "log")
+
+    def __init__(self, scan, delete, punish, log, workers=4, queue_size=1000,
+                 log_queue_size=200, offload_threshold=2000):
+        self.scan = scan
+        self.delete = delete
+        self.punish = punish
+        self.log = log
+        self.workers = workers
+        self.offload_threshold = offload_threshold
+
+        self.scan_queue = asyncio.Queue(maxsize=queue_size)
+        self.delete_queue = asyncio.Queue()
+        self.punish_queue = asyncio.Queue()
+        self.log_queue = deque(maxlen=log_queue_size)
+        self.log_ready = asyncio.Event()
+
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="modscan")
+        self.stats = {stage: StageStats() for stage in self.STAGES}
+        self.inline_scans = 0
+        self.tasks = []
+
+    def start(self):
+        if self.tasks:
+            return
+        for _ in range(self.workers):
+            self.tasks.append(asyncio.create_task(self._scan_worker()))
+        self.tasks.append(asyncio.create_task(self._delete_worker()))
+        self.tasks.append(asyncio.create_task(self._punish_worker()))
+        self.tasks.append(asyncio.create_task(self._log_worker()))
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        self.executor.shutdown(wait=False)
+
+    def submit(self, message):
+        try:
+            self.scan_queue.put_nowait((message, time.perf_counter()))
+        except asyncio.QueueFull:
+            # Scanning is cheap; do it inline rather than risk missing a delete
+            self.inline_scans += 1
+            started = time.perf_counter()
+            matches = self.scan(message)
+            self.stats["scan"].record(time.perf_counter() - started)
+            if matches:
+                self.delete_queue.put_nowait((message, matches, None, time.perf_counter()))
+
+    def flag(self, message, matches, reason=None):
+        """Queues an already-flagged message straight for deletion."""
+        self.delete_queue.put_nowait((message, matches, reason, time.perf_counter()))
+
+    def depths(self):
+        return {
+            "scan": self.scan_queue.qsize(),
+            "delete": self.delete_queue.qsize(),
+            "punish": self.punish_queue.qsize(),
+            "log": len(self.log_queue),
+        }
+
+    def _queue_log(self, message, matches, reason):
+        if len(self.log_queue) == self.log_queue.maxlen:
+            self.stats["log"].dropped += 1
+        self.log_queue.append((message, matches, reason, time.perf_counter()))
+        self.log_ready.set()
+
+    async def _scan_worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            message, queued_at = await self.scan_queue.get()
+            try:
+                if len(message.content) > self.offload_threshold:
+                    matches = await loop.run_in_executor(self.executor, self.scan, message)
+                else:
+                    matches = self.scan(message)
+                if matches:
+                    self.delete_queue.put_nowait((message, matches, None, time.perf_counter()))
+                self.stats["scan"].record(time.perf_counter() - queued_at)
+            except Exception as e:
+                self.stats["scan"].errors += 1
+                print(f"Moderation scan failed: {e}")
+            finally:
+                self.scan_queue.task_done()
+
+    async def _delete_worker(self):
+        while True:
+            message, matches, reason, queued_at = await self.delete_queue.get()
+            try:
+                await self.delete(message, matches, reason)
+                self.stats["delete"].record(time.perf_counter() - queued_at)
+            except Exception as e:
+                self.stats["delete"].errors += 1
+                print(f"Moderation delete failed: {e}")
+            finally:
+                self.punish_queue.put_nowait((message, matches, reason, time.perf_counter()))
+                self.delete_queue.task_done()
+
+    async def _punish_worker(self):
+        while True:
+            message, matches, reason, queued_at = await self.punish_queue.get()
+            try:
+                await self.punish(message, matches, reason)
+                self.stats["punish"].record(time.perf_counter() - queued_at)
+            except Exception as e:
+                self.stats["punish"].errors += 1
+                print(f"Moderation punish failed: {e}")
+            finally:
+                self._queue_log(message, matches, reason)
+                self.punish_queue.task_done()
+
+    async def _log_worker(self):
+        while True:
+            await self.log_ready.wait()
+            while self.log_queue:
+                message, matches, reason, queued_at = self.log_queue.popleft()
+                try:
+                    await self.log(message, matches, reason)
+                    self.stats["log"].record(time.perf_counter() - queued_at)
+                except Exception as e:
+                    self.stats["log"].errors += 1
+                    print(f"Moderation log failed: {e}")
+            self.log_ready.clear()
@@ -0,0 +1,144 @@
+import re
+import unicodedata
+from bisect import bisect_right
+
+# Stands in for characters that should vanish, so translate() keeps the
+# original length and offsets stay 1:1 until the collapse pass
+SENTINEL = "\x00"
+
+INVISIBLE = (
+    [0x00AD, 0x180E, 0x200B, 0x200C, 0x200D, 0x2060, 0xFEFF]
+    + list(range(0x0300, 0x0370))  # combining diacritics ("zalgo")
+    + list(range(0xFE00, 0xFE10))  # variation selectors
+)
+
+LEETSPEAK = {"0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "@": "a", "$": "s"}
+LEET_TABLE = str.maketrans(LEETSPEAK)
+LEET_CHARS = re.compile(r"[013457@$]")
+
+# Leetspeak only applies inside tokens that also contain a letter ("a55",
+# "$h1t"), so room numbers, times and phone numbers are left alone
+LEET_TOKEN = re.compile(r"[\w@$]+")
+HAS_LETTER = re.compile(r"[^\W\d_]")
+
+
+def translate_leetspeak(match):
+    token = match.group()
+    return token.translate(LEET_TABLE) if HAS_LETTER.search(token) else token
+
+# Cyrillic and Greek letters that render like Latin ones
+CONFUSABLES = {
+    "а": "a", "в": "b", "е": "e", "ё": "e", "к": "k", "м": "m", "н": "h", "о": "o",
+    "р": "p", "с": "c", "т": "t", "у": "y", "х": "x", "і": "i", "ї": "i", "ј": "j",
+    "ѕ": "s", "ԁ": "d", "ԛ": "q", "ԝ": "w", "ɡ": "g",
+    "α": "a", "β": "b", "ε": "e", "η": "n", "ι": "i", "κ": "k", "ν": "v", "ο": "o",
+    "ρ": "p", "τ": "t", "υ": "u", "χ": "x", "ω": "w",
+}
+
+
+def build_table():
+    table = {}
+    # Accented, full-width, circled and mathematical letters all decompose
+    # to a base ASCII letter plus optional combining marks
+    for codepoint in range(0x80, 0x20000):
+        decomposed = unicodedata.normalize("NFKD", chr(codepoint))
+        base = decomposed[:1]
+        if base.isascii() and base.isalpha() and all(
+            unicodedata.combining(c) for c in decomposed[1:]
+        ):
+            table[codepoint] = base.lower()
+
+    for char, replacement in CONFUSABLES.items():
+        table[ord(char)] = replacement
+        table[ord(char.upper())] = replacement
+    for codepoint in INVISIBLE:
+        table[codepoint] = SENTINEL
+    return table
+
+
+TRANSLATION_TABLE = build_table()
+
+# Invisible characters, or three or more single letters split by the same
+# run of spaces or punctuation ("d i c k", "d.i.c.k")
+COLLAPSE_PATTERN = re.compile(
+    rf"{SENTINEL}+"
+    r"|(?<!\w)[^\W\d_](?P<sep>[\s.\-_*]{1,2})(?:[^\W\d_](?P=sep))+[^\W\d_](?!\w)"
+)
+SEPARATORS = re.compile(rf"[\s.\-_*{SENTINEL}]")
+
+# Cheap necessary condition for the spaced-letters branch; the full pattern's
+# lookbehind makes it several times slower to run on clean text
+SPACED_HINT = re.compile(r"[^\W\d_][\s.\-_*]{1,2}[^\W\d_][\s.\-_*]")
+SPACED_HINT_INNER = re.compile(r"\W" + SPACED_HINT.pattern)
+
+
+def needs_collapse(translated):
+    return (
+        SENTINEL in translated
+        or SPACED_HINT.match(translated) is not None
+        or SPACED_HINT_INNER.search(translated) is not None
+    )
+
+
+class NormalizedText:
+    """Normalized form of a message plus the map back to original offsets.
+
+    ``translate`` is length-preserving, so offsets only shift where the
+    collapse pass removed characters. Each collapsed run is recorded as an
+    anchor; any other position maps back by a constant offset found with a
+    binary search over the anchors.
+    """
+
+    __slots__ = ("original", "text", "norm_starts", "norm_ends", "orig_maps", "shifts")
+
+    def __init__(self, original):
+        self.original = original
+        self.norm_starts = []
+        self.norm_ends = []
+        self.orig_maps = []
+        self.shifts = []
+
+        translated = original.translate(TRANSLATION_TABLE)
+        if LEET_CHARS.search(translated):
+            translated = LEET_TOKEN.sub(translate_leetspeak, translated)
+        if not needs_collapse(translated):
+            self.text = translated
+            return
+
+        pieces = []
+        cursor = 0
+        length = 0
+        for match in COLLAPSE_PATTERN.finditer(translated):
+            pieces.append(translated[cursor:match.start()])
+            length += match.start() - cursor
+            kept = [
+                match.start() + i for i, c in enumerate(match.group())
+                if not SEPARATORS.fullmatch(c)
+            ]
+            pieces.append("".join(translated[i] for i in kept))
+            self.norm_starts.append(length)
+            self.orig_maps.append(kept)
+            length += len(kept)
+            self.norm_ends.append(length)
+            self.shifts.append(match.end() - length)
+            cursor = match.end()
+        pieces.append(translated[cursor:])
+        self.text = "".join(pieces)
+
+    def to_original(self, index):
+        anchor = bisect_right(self.norm_starts, index) - 1
+        if anchor < 0:
+            return index
+        if index < self.norm_ends[anchor]:
+            return self.orig_maps[anchor][index - self.norm_starts[anchor]]
+        return index + self.shifts[anchor]
+
+    def span(self, start, end):
+        """Maps a normalized ``[start, end)`` span back onto the original text."""
+        if start == end:
+            return start, end
+        return self.to_original(start), self.to_original(end - 1) + 1
+
+
+def normalize(content):
+    return NormalizedText(content)
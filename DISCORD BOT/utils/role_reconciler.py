@@ -0,0 +1,121 @@
+import asyncio
+
+import discord
+
+
+class RoleReconciler:
+    """Debounced role add/remove that only calls the API for the final state.
+
+    ``set(member, role, wanted)`` records the desired state and (re)arms a
+    ``window``-second timer for that member and role. When the timer fires,
+    the desired state is compared with the last applied one and at most one
+    ``add_roles`` / ``remove_roles`` call is made, so a member flapping their
+    camera ten times in a few seconds costs one edit (or none, if they end
+    where they started).
+
+    The applied state is seeded from ``member.roles`` the first time a member
+    is seen and then kept locally, so redundant requests never reach Discord.
+    """
+
+    def __init__(self, window=2.0, reason=None):
+        self.window = window
+        self.reason = reason
+        self.desired = {}
+        self.applied = {}
+        self.pending = {}
+        # Updates whose timer has fired, kept so stop() can cancel them
+        self.tasks = set()
+        self.role_ids = set()
+        self.issued = 0
+        self.suppressed = 0
+        self.errors = 0
+
+    @staticmethod
+    def key(member, role):
+        return (member.guild.id, member.id, role.id)
+
+    def set(self, member, role, wanted):
+        key = self.key(member, role)
+        if key not in self.applied:
+            self.applied[key] = role in member.roles
+            self.role_ids.add(role.id)
+        self.desired[key] = wanted
+
+        handle = self.pending.pop(key, None)
+        if handle:
+            # A newer state supersedes the one that was waiting
+            handle[0].cancel()
+            self.suppressed += 1
+        elif self.applied[key] == wanted:
+            self.suppressed += 1
+            return
+
+        loop = asyncio.get_running_loop()
+        timer = loop.call_later(self.window, self._start, key)
+        self.pending[key] = (timer, member, role)
+
+    def _start(self, key):
+        task = asyncio.create_task(self._apply(key))
+        self.tasks.add(task)
+        task.add_done_callback(self._task_done)
+
+    def _task_done(self, task):
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            self.errors += 1
+            print(f"Role update task failed: {task.exception()}")
+
+    def observe(self, member):
+        """Syncs the applied state with ``member.roles`` (e.g. a role edited by hand)."""
+        for role_id in self.role_ids:
+            key = (member.guild.id, member.id, role_id)
+            if key in self.applied and key not in self.pending:
+                self.applied[key] = member.get_role(role_id) is not None
+
+    def forget(self, member):
+        """Drops the cached state for a member, e.g. after they leave the guild."""
+        for role_id in self.role_ids:
+            key = (member.guild.id, member.id, role_id)
+            self.applied.pop(key, None)
+            self.desired.pop(key, None)
+            handle = self.pending.pop(key, None)
+            if handle:
+                handle[0].cancel()
+
+    async def _apply(self, key):
+        handle = self.pending.pop(key, None)
+        if not handle:
+            return
+        _, member, role = handle
+        wanted = self.desired[key]
+        if self.applied.get(key) == wanted:
+            # Flapped back to where it started
+            self.suppressed += 1
+            return
+
+        try:
+            if wanted:
+                await member.add_roles(role, reason=self.reason)
+            else:
+                await member.remove_roles(role, reason=self.reason)
+            self.applied[key] = wanted
+            self.issued += 1
+        except discord.HTTPException as e:
+            # Re-read the real state from member.roles next time
+            self.applied.pop(key, None)
+            self.errors += 1
+            print(f"Role update failed for {member}: {e}")
+
+    async def flush(self):
+        """Applies every pending change now (used on unload)."""
+        keys = list(self.pending)
+        for key in keys:
+            self.pending[key][0].cancel()
+        await asyncio.gather(*(self._apply(key) for key in keys))
+
+    async def stop(self):
+        """Applies pending changes, then cancels updates still in flight (used on unload)."""
+        await self.flush()
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
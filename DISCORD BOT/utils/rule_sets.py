@@ -0,0 +1,141 @@
+import asyncio
+import json
+import os
+from utils.keyword_matcher import KeywordMatcher, clean_keywords
+
+
+class RuleSetRegistry:
+    """Versioned keyword rule sets, one per guild plus a shared default.
+
+    Rule sets are stored in a JSON file as
+    ``{"default": {"version": 3, "keywords": [...]}, "<guild_id>": {...}}``.
+    Guilds without their own entry use ``default``; the first edit made from
+    a guild forks the default into a guild-specific set.
+
+    Matchers are rebuilt on a worker thread and then published together with
+    a new generation number as a single tuple assignment, so scanners (which
+    may themselves run on threads) always see a complete matcher. Sets whose
+    keywords didn't change keep their matcher, and the generation (which
+    drops cached verdicts) only moves when one did.
+
+    Only a missing file falls back to the defaults. A file that can't be
+    parsed raises ``ValueError`` from ``reload`` and leaves the current sets
+    in place (at startup, the defaults). Edits are then refused until a
+    reload succeeds, so a half-edited file is never overwritten.
+    """
+
+    DEFAULT = "default"
+
+    def __init__(self, path, default_keywords=()):
+        self.path = path
+        self.lock = asyncio.Lock()
+        self.load_error = None
+
+        try:
+            self.rule_sets = self._read(default_keywords)
+        except ValueError as e:
+            print(f"Rule sets in {path} not loaded, using defaults: {e}")
+            self.load_error = e
+            self.rule_sets = {self.DEFAULT: {"version": 1, "keywords": sorted(set(default_keywords))}}
+        self.state = (1, {
+            name: KeywordMatcher(rule_set["keywords"])
+            for name, rule_set in self.rule_sets.items()
+        })
+
+    def _read(self, default_keywords):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                rule_sets = json.load(f)
+        except FileNotFoundError:
+            rule_sets = {}
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{self.path} is not valid JSON: {e}") from e
+
+        if not isinstance(rule_sets, dict) or not all(
+            isinstance(rule_set, dict) and isinstance(rule_set.get("keywords"), list)
+            and isinstance(rule_set.get("version"), int)
+            for rule_set in rule_sets.values()
+        ):
+            raise ValueError(f"{self.path} must map names to {{\"version\": int, \"keywords\": [...]}}")
+        rule_sets.setdefault(self.DEFAULT, {"version": 1, "keywords": sorted(set(default_keywords))})
+        return rule_sets
+
+    def _write(self, rule_sets):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(rule_sets, f, indent=4)
+        os.replace(tmp_path, self.path)
+
+    @property
+    def generation(self):
+        return self.state[0]
+
+    def scope(self, guild_id):
+        return str(guild_id) if str(guild_id) in self.rule_sets else self.DEFAULT
+
+    def matcher_for(self, guild_id):
+        """Returns ``(generation, scope, matcher)`` from one consistent snapshot."""
+        generation, matchers = self.state
+        scope = str(guild_id)
+        if scope not in matchers:
+            scope = self.DEFAULT
+        return generation, scope, matchers[scope]
+
+    def get(self, guild_id):
+        return self.rule_sets[self.scope(guild_id)]
+
+    @staticmethod
+    def _clean(terms):
+        return {term.strip().lower() for term in terms if term.strip()}
+
+    async def add(self, guild_id, terms):
+        terms = self._clean(terms)
+        return await self._edit(guild_id, lambda keywords: keywords | terms)
+
+    async def remove(self, guild_id, terms):
+        terms = self._clean(terms)
+        return await self._edit(guild_id, lambda keywords: keywords - terms)
+
+    async def _edit(self, guild_id, change):
+        async with self.lock:
+            if self.load_error:
+                raise ValueError(f"Rule sets weren't loaded ({self.load_error}); fix the file and reload first")
+            current = self.get(guild_id)
+            keywords = sorted(change(set(current["keywords"])))
+            if keywords == current["keywords"]:
+                return current
+
+            rule_set = {"version": current["version"] + 1, "keywords": keywords}
+            rule_sets = {**self.rule_sets, str(guild_id): rule_set}
+            matcher = await asyncio.to_thread(KeywordMatcher, keywords)
+            await asyncio.to_thread(self._write, rule_sets)
+
+            generation, matchers = self.state
+            self.rule_sets = rule_sets
+            self.state = (generation + 1, {**matchers, str(guild_id): matcher})
+            return rule_set
+
+    async def reload(self):
+        """Re-reads the file; raises ``ValueError`` and keeps the current sets if it can't be parsed."""
+        async with self.lock:
+            try:
+                rule_sets = await asyncio.to_thread(self._read, self.rule_sets[self.DEFAULT]["keywords"])
+            except ValueError as e:
+                self.load_error = e
+                raise
+            generation, current = self.state
+            matchers = await asyncio.to_thread(lambda: {
+                name: (
+                    current[name]
+                    if name in current and current[name].keywords == clean_keywords(rule_set["keywords"])
+                    else KeywordMatcher(rule_set["keywords"])
+                )
+                for name, rule_set in rule_sets.items()
+            })
+            changed = matchers.keys() != current.keys() or any(
+                matcher is not current[name] for name, matcher in matchers.items()
+            )
+            self.rule_sets = rule_sets
+            self.state = (generation + 1 if changed else generation, matchers)
+            self.load_error = None
+            return rule_sets
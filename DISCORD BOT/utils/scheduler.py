@@ -0,0 +1,209 @@
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.journal import read_journal
+
+
+class DeadlineScheduler:
+    """Runs keyed jobs at wall-clock deadlines from a single task and a min-heap.
+
+    The task sleeps until the earliest deadline (or until an earlier one is
+    scheduled) instead of polling. Rescheduling or cancelling a key is O(log n):
+    superseded heap entries are left in place and skipped when popped.
+
+    ``handler`` is a coroutine taking ``(key, payload)``. When ``path`` is
+    given, pending deadlines are persisted and restored on startup; anything
+    that fell due while the bot was down runs as soon as the scheduler starts.
+    Like ``WarningStore``, changes are appended to a journal next to ``path``
+    (one line per changed key, coalesced over ``save_delay``) and folded into
+    an atomically renamed snapshot once the journal outgrows it.
+    """
+
+    # Journal records kept before compacting, on top of one per live entry
+    compact_after = 1000
+
+    def __init__(self, handler, path=None, save_delay=1.0, clock=time.time):
+        self.handler = handler
+        self.path = path
+        self.save_delay = save_delay
+        self.clock = clock
+        self.heap = []
+        self.entries = {}
+        self.counter = itertools.count()
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.save_handle = None
+        self.dirty = set()
+        self.seq = 0
+        self.journal_records = 0
+        # One writer thread keeps snapshot writes in order
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scheduler")
+        self.fired = 0
+
+        if path:
+            self.journal_path = path + ".journal"
+            self.load()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            saved = {}
+        except json.JSONDecodeError as e:
+            # Keep the broken file for inspection; the next snapshot would overwrite it
+            os.replace(self.path, self.path + ".corrupt")
+            print(f"Scheduler snapshot {self.path} is corrupt ({e}); moved it to {self.path}.corrupt "
+                  f"and restoring only what its journal holds")
+            saved = {}
+        if "seq" in saved and "entries" in saved:
+            self.seq = saved["seq"]
+            saved = saved["entries"]
+        snapshot_seq = self.seq
+        for key, entry in saved.items():
+            self._push(key, entry["due"], entry.get("payload"))
+
+        for record in read_journal(self.journal_path):
+            self.journal_records += 1
+            # Left over from a crash between a snapshot and the journal reset
+            if record["seq"] <= snapshot_seq:
+                continue
+            self.seq = max(self.seq, record["seq"])
+            if "due" in record:
+                self._push(record["key"], record["due"], record.get("payload"))
+            else:
+                self.entries.pop(record["key"], None)
+
+    def _push(self, key, due, payload):
+        seq = next(self.counter)
+        self.entries[key] = (due, seq, payload)
+        heapq.heappush(self.heap, (due, seq, key))
+
+        # Rebuild once superseded entries outnumber live ones
+        if len(self.heap) > 2 * len(self.entries) + 64:
+            self.heap = [(due, seq, key) for key, (due, seq, _) in self.entries.items()]
+            heapq.heapify(self.heap)
+
+    def schedule(self, key, due, payload=None):
+        """Sets (or moves) the deadline for ``key`` to the timestamp ``due``."""
+        earliest = self.heap[0][0] if self.heap else None
+        self._push(key, due, payload)
+        if earliest is None or due < earliest:
+            self.wakeup.set()
+        self._changed(key)
+
+    def schedule_in(self, key, delay, payload=None):
+        self.schedule(key, self.clock() + delay, payload)
+
+    def cancel(self, key):
+        if self.entries.pop(key, None) is None:
+            return False
+        self._changed(key)
+        return True
+
+    def payload(self, key):
+        entry = self.entries.get(key)
+        return entry[2] if entry else None
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        if self.save_handle:
+            self.save_handle.cancel()
+            self._save()
+        if self.path:
+            # Waits for the queued writes, including the one just made
+            await asyncio.get_running_loop().run_in_executor(self.writer, lambda: None)
+
+    async def _run(self):
+        while True:
+            self.wakeup.clear()
+            now = self.clock()
+            while self.heap and self.heap[0][0] <= now:
+                due, seq, key = heapq.heappop(self.heap)
+                entry = self.entries.get(key)
+                if entry is None or entry[1] != seq:
+                    continue
+                del self.entries[key]
+                self._changed(key)
+                self.fired += 1
+                try:
+                    await self.handler(key, entry[2])
+                except Exception as e:
+                    print(f"Scheduled job {key} failed: {e}")
+                now = self.clock()
+
+            # Drop cancelled entries off the top so they never cause a wakeup
+            while self.heap and self.entries.get(self.heap[0][2], (None, None))[1] != self.heap[0][1]:
+                heapq.heappop(self.heap)
+
+            timeout = self.heap[0][0] - now if self.heap else None
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    # Persistence
+    def _snapshot(self):
+        return {
+            "seq": self.seq,
+            "entries": {key: {"due": due, "payload": payload} for key, (due, _, payload) in self.entries.items()},
+        }
+
+    def _write(self, snapshot):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, self.path)
+        # Records up to the snapshot's seq are now skipped on load anyway
+        open(self.journal_path, "w").close()
+
+    def _append(self, records):
+        with open(self.journal_path, "a") as f:
+            f.write("".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records))
+
+    def _changed(self, key):
+        if not self.path:
+            return
+        self.dirty.add(key)
+        if self.save_handle:
+            return
+        loop = asyncio.get_running_loop()
+        self.save_handle = loop.call_later(self.save_delay, self._save)
+
+    def _save(self):
+        self.save_handle = None
+        records = []
+        for key in self.dirty:
+            self.seq += 1
+            entry = self.entries.get(key)
+            if entry:
+                records.append({"seq": self.seq, "key": key, "due": entry[0], "payload": entry[2]})
+            else:
+                records.append({"seq": self.seq, "key": key})
+        self.dirty.clear()
+
+        loop = asyncio.get_running_loop()
+        self.journal_records += len(records)
+        if self.journal_records > self.compact_after + len(self.entries):
+            self.journal_records = 0
+            loop.run_in_executor(self.writer, self._write, self._snapshot())
+        elif records:
+            loop.run_in_executor(self.writer, self._append, records)
@@ -0,0 +1,203 @@
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+
+
+class UserActivity:
+    __slots__ = ("times", "last_hash", "repeats", "last_seen")
+
+    def __init__(self, rate_limit, duplicate_limit):
+        self.times = deque(maxlen=rate_limit)
+        self.last_hash = None
+        self.repeats = deque(maxlen=duplicate_limit)
+        self.last_seen = 0.0
+
+
+class ChannelActivity:
+    __slots__ = ("times", "fresh", "last_seen")
+
+    def __init__(self, channel_limit):
+        self.times = deque(maxlen=channel_limit)
+        # How many of ``times`` came from freshly joined members
+        self.fresh = 0
+        self.last_seen = 0.0
+
+
+class GuildActivity:
+    __slots__ = ("posters", "fresh")
+
+    def __init__(self):
+        # author_id -> last post time within the raid window, oldest first
+        self.posters = OrderedDict()
+        self.fresh = OrderedDict()
+
+
+class SpamDetector:
+    """Sliding-window burst and raid detection with amortized O(1) work per message.
+
+    Burst counters are fixed-size ring buffers of ``(timestamp, author_id)``
+    pairs: a limit of N messages per window is exceeded when the buffer is
+    full and its oldest entry is still inside the window. Per-user, per-channel and per-content
+    state lives in LRU-ordered dicts, and idle entries are evicted from the
+    cold end as new messages arrive; each guild's recent posters expire the
+    same way once they fall out of ``raid_window``. Memory stays bounded by
+    the number of recently active users.
+
+    ``check`` returns a reason string when the author should be muted.
+    Raid mode needs a raid signal, not just traffic:
+
+    * the same text posted by many members (only fresh accounts and texts of
+      at least ``raid_min_length`` characters count, so a chat full of "lol"
+      is not a raid);
+    * a wave of freshly joined members posting: at least ``raid_posters`` of
+      them, making up at least ``raid_fresh_share`` of everyone who posted in
+      the guild during ``raid_window``, so the bar rises with the server's
+      own activity;
+    * a channel flood in which at least ``raid_fresh_share`` of the messages
+      come from fresh accounts. A busy channel of established members alone
+      never counts.
+    """
+
+    def __init__(self, user_limit=6, user_window=5.0, channel_limit=50, channel_window=5.0,
+                 duplicate_limit=4, duplicate_window=30.0, raid_posters=8, raid_window=30.0,
+                 join_window=600.0, raid_duration=600.0, raid_min_length=30, raid_fresh_share=0.3,
+                 idle_ttl=120.0, max_tracked=10000):
+        self.user_limit = user_limit
+        self.user_window = user_window
+        self.channel_limit = channel_limit
+        self.channel_window = channel_window
+        self.duplicate_limit = duplicate_limit
+        self.duplicate_window = duplicate_window
+        self.raid_posters = raid_posters
+        self.raid_window = raid_window
+        self.join_window = join_window
+        self.raid_duration = raid_duration
+        self.raid_min_length = raid_min_length
+        self.raid_fresh_share = raid_fresh_share
+        self.idle_ttl = idle_ttl
+        self.max_tracked = max_tracked
+
+        self.users = OrderedDict()
+        self.channels = OrderedDict()
+        self.contents = OrderedDict()
+        self.guilds = {}
+        self.raid_until = {}
+
+    # Raid mode
+    def in_raid_mode(self, guild_id, now=None):
+        now = time.monotonic() if now is None else now
+        return self.raid_until.get(guild_id, 0.0) > now
+
+    def raid_remaining(self, guild_id, now=None):
+        now = time.monotonic() if now is None else now
+        return max(self.raid_until.get(guild_id, 0.0) - now, 0.0)
+
+    def clear_expired_raid(self, guild_id, now=None):
+        """Forgets a raid that has run out; returns whether there was one to forget."""
+        now = time.monotonic() if now is None else now
+        until = self.raid_until.get(guild_id)
+        if until is None or until > now:
+            return False
+        del self.raid_until[guild_id]
+        return True
+
+    def set_raid_mode(self, guild_id, active, now=None):
+        now = time.monotonic() if now is None else now
+        was_active = self.in_raid_mode(guild_id, now)
+        if active:
+            self.raid_until[guild_id] = now + self.raid_duration
+        else:
+            self.raid_until.pop(guild_id, None)
+        return was_active != active
+
+    # Detection
+    @staticmethod
+    def _burst(times, window, now):
+        return len(times) == times.maxlen and now - times[0][0] <= window
+
+    def _touch(self, table, key, factory, now):
+        entry = table.get(key)
+        if entry is None:
+            entry = table[key] = factory()
+        else:
+            table.move_to_end(key)
+
+        # Evict idle entries from the cold end; each entry is evicted at most once
+        while table:
+            oldest_key, oldest = next(iter(table.items()))
+            if oldest_key == key:
+                break
+            last_seen = oldest[-1][0] if isinstance(oldest, deque) else oldest.last_seen
+            if now - last_seen < self.idle_ttl and len(table) <= self.max_tracked:
+                break
+            table.popitem(last=False)
+        return entry
+
+    def _recent(self, posters, author_id, now):
+        """Marks ``author_id`` as having posted and drops posters outside the raid window."""
+        if author_id is not None:
+            posters[author_id] = now
+            posters.move_to_end(author_id)
+        while posters and now - next(iter(posters.values())) > self.raid_window:
+            posters.popitem(last=False)
+        return len(posters)
+
+    def check(self, message, now=None):
+        """Records a message and returns ``(mute_reason, raid_started)``."""
+        now = time.monotonic() if now is None else now
+        guild_id = message.guild.id
+        author_id = message.author.id
+        content = message.content.strip().lower()
+        content_hash = hash(content)
+        raid_started = False
+
+        joined_at = getattr(message.author, "joined_at", None)
+        fresh = (
+            joined_at is not None
+            and (datetime.now(timezone.utc) - joined_at).total_seconds() < self.join_window
+        )
+
+        guild = self.guilds.setdefault(guild_id, GuildActivity())
+        active = self._recent(guild.posters, author_id, now)
+        fresh_active = self._recent(guild.fresh, author_id if fresh else None, now)
+        if fresh_active >= max(self.raid_posters, self.raid_fresh_share * active):
+            raid_started |= self.set_raid_mode(guild_id, True, now)
+
+        channel = self._touch(
+            self.channels, message.channel.id, lambda: ChannelActivity(self.channel_limit), now
+        )
+        if len(channel.times) == channel.times.maxlen and channel.times[0][2]:
+            channel.fresh -= 1
+        channel.times.append((now, author_id, fresh))
+        channel.fresh += fresh
+        channel.last_seen = now
+        if (self._burst(channel.times, self.channel_window, now)
+                and channel.fresh >= self.raid_fresh_share * len(channel.times)):
+            raid_started |= self.set_raid_mode(guild_id, True, now)
+
+        if content and (fresh or len(content) >= self.raid_min_length):
+            posters = self._touch(
+                self.contents, content_hash, lambda: deque(maxlen=self.raid_posters), now
+            )
+            if not posters or posters[-1][1] != author_id:
+                posters.append((now, author_id))
+            if self._burst(posters, self.raid_window, now) and len({a for _, a in posters}) > 1:
+                raid_started |= self.set_raid_mode(guild_id, True, now)
+
+        user = self._touch(
+            self.users, author_id, lambda: UserActivity(self.user_limit, self.duplicate_limit), now
+        )
+        user.last_seen = now
+        user.times.append((now, author_id))
+        if content_hash != user.last_hash:
+            user.last_hash = content_hash
+            user.repeats.clear()
+        user.repeats.append((now, author_id))
+
+        if self._burst(user.times, self.user_window, now):
+            return "message rate", raid_started
+        if message.content and self._burst(user.repeats, self.duplicate_window, now):
+            return "duplicate messages", raid_started
+        if fresh and self.in_raid_mode(guild_id, now):
+            return "new member posting during raid", raid_started
+        return None, raid_started
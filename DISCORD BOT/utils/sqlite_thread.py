@@ -0,0 +1,46 @@
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+
+class SQLiteThread:
+    """A SQLite database (WAL mode) whose connection lives on one dedicated thread.
+
+    sqlite3 connections can't be shared across threads, so every query runs
+    on the object's own single worker through ``_call`` and the event loop
+    never blocks on disk. Subclasses set ``SCHEMA`` and ``THREAD_NAME``,
+    write their queries as plain methods using ``self.conn``, and expose
+    them as coroutines that go through ``_call``.
+    """
+
+    SCHEMA = ""
+    THREAD_NAME = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=self.THREAD_NAME)
+        self.conn = None
+
+    def _submit(self, fn, *args):
+        """Queues ``fn`` on the database thread and returns its future without waiting."""
+        return asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def _call(self, fn, *args):
+        return await self._submit(fn, *args)
+
+    async def open(self):
+        await self._call(self._open)
+
+    def _open(self):
+        self.conn = sqlite3.connect(self.path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL is still crash-safe; only the last commit can be lost on power failure
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=5000")
+        self.conn.executescript(self.SCHEMA)
+
+    async def close(self):
+        if self.conn:
+            await self._call(self.conn.close)
+            self.conn = None
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,251 @@
+import heapq
+import time
+from array import array
+
+from utils.sqlite_thread import SQLiteThread
+
+MEMBER = "member"
+CHANNEL = "channel"
+METRICS = ("voice", "camera")
+PERIODS = ("today", "week", "all")
+
+# One row per member/channel per UTC day. ``hours`` is 48 native uint32
+# counters of seconds: voice time for hours 0-23, then camera/stream time
+# for hours 0-23 (192 bytes). ``voice`` / ``camera`` are the day's totals
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS member_days (
+    id INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    hours BLOB NOT NULL,
+    voice INTEGER NOT NULL,
+    camera INTEGER NOT NULL,
+    PRIMARY KEY (id, day)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS member_days_day ON member_days (day);
+
+CREATE TABLE IF NOT EXISTS channel_days (
+    id INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    hours BLOB NOT NULL,
+    voice INTEGER NOT NULL,
+    camera INTEGER NOT NULL,
+    PRIMARY KEY (id, day)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS channel_days_day ON channel_days (day);
+
+CREATE TABLE IF NOT EXISTS totals (
+    kind TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    voice INTEGER NOT NULL,
+    camera INTEGER NOT NULL,
+    PRIMARY KEY (kind, id)
+) WITHOUT ROWID;
+"""
+
+TABLES = {MEMBER: "member_days", CHANNEL: "channel_days"}
+BUCKET_SIZE = 48
+
+
+def empty_bucket():
+    return array("I", bytes(4 * BUCKET_SIZE))
+
+
+def current_day(now=None):
+    return int(now if now is not None else time.time()) // 86400
+
+
+class StudyStats(SQLiteThread):
+    """Voice and camera/stream time per member and per channel.
+
+    ``credit`` adds one interval, split on hour boundaries, to in-memory
+    hourly buckets. ``flush`` merges them into the per-day rows on the
+    database thread, so each member-day costs one small fixed-size row no
+    matter how many sessions it covers.
+
+    Leaderboards come from aggregates kept up to date by ``credit``: all-time
+    totals, today's totals and a rolling ``history_days`` window that drops
+    a day's totals when it expires. The I/O methods are coroutines run on
+    the database thread.
+    """
+
+    SCHEMA = SCHEMA
+    THREAD_NAME = "study-stats"
+
+    def __init__(self, path, history_days=7, clock=time.time):
+        super().__init__(path)
+        self.history_days = history_days
+        self.clock = clock
+        # (kind, id, day) -> bucket not yet written to disk
+        self.pending = {}
+        self.totals = {MEMBER: {}, CHANNEL: {}}
+        self.window = {MEMBER: {}, CHANNEL: {}}
+        # day -> kind -> id -> [voice, camera], for the days in the window
+        self.days = {}
+        self.today = current_day(clock())
+
+    async def open(self):
+        await super().open()
+        totals, recent = await self._call(self._load, self.today - self.history_days + 1)
+        for kind, key, voice, camera in totals:
+            self.totals[kind][key] = [voice, camera]
+        for kind, key, day, voice, camera in recent:
+            self._add(self.days.setdefault(day, {MEMBER: {}, CHANNEL: {}})[kind], key, voice, camera)
+            self._add(self.window[kind], key, voice, camera)
+
+    def _load(self, first_day):
+        totals = self.conn.execute("SELECT kind, id, voice, camera FROM totals").fetchall()
+        recent = []
+        for kind, table in TABLES.items():
+            recent.extend(
+                (kind, *row) for row in self.conn.execute(
+                    f"SELECT id, day, voice, camera FROM {table} WHERE day >= ?", (first_day,)
+                )
+            )
+        return totals, recent
+
+    async def close(self):
+        await self.flush()
+        await super().close()
+
+    @staticmethod
+    def _add(aggregates, key, voice, camera):
+        entry = aggregates.get(key)
+        if entry is None:
+            aggregates[key] = [voice, camera]
+        else:
+            entry[0] += voice
+            entry[1] += camera
+
+    def _advance(self, day):
+        """Moves "today" forward, dropping days that left the window."""
+        if day <= self.today:
+            return
+        self.today = day
+        for expired in [d for d in self.days if d <= day - self.history_days]:
+            for kind, aggregates in self.days.pop(expired).items():
+                window = self.window[kind]
+                for key, (voice, camera) in aggregates.items():
+                    entry = window[key]
+                    entry[0] -= voice
+                    entry[1] -= camera
+                    if not entry[0]:
+                        del window[key]
+
+    def credit(self, member_id, channel_id, start, end, camera):
+        """Adds the time between ``start`` and ``end`` (epoch seconds)."""
+        start, end = round(start), round(end)
+        while start < end:
+            hour_end = min(end, (start // 3600 + 1) * 3600)
+            seconds = hour_end - start
+            day, hour = divmod(start // 3600, 24)
+            self._advance(day)
+            camera_seconds = seconds if camera else 0
+            for kind, key in ((MEMBER, member_id), (CHANNEL, channel_id)):
+                bucket = self.pending.get((kind, key, day))
+                if bucket is None:
+                    bucket = self.pending[(kind, key, day)] = empty_bucket()
+                bucket[hour] += seconds
+                bucket[24 + hour] += camera_seconds
+
+                self._add(self.totals[kind], key, seconds, camera_seconds)
+                if day > self.today - self.history_days:
+                    self._add(self.days.setdefault(day, {MEMBER: {}, CHANNEL: {}})[kind], key, seconds, camera_seconds)
+                    self._add(self.window[kind], key, seconds, camera_seconds)
+            start = hour_end
+
+    async def flush(self):
+        """Merges the pending buckets into their day rows in one transaction."""
+        if not self.pending or not self.conn:
+            return
+        pending, self.pending = self.pending, {}
+        try:
+            await self._call(self._flush, pending)
+        except Exception:
+            # Nothing was written; merge them back so the next flush retries
+            for key, delta in pending.items():
+                bucket = self.pending.get(key)
+                if bucket is None:
+                    self.pending[key] = delta
+                else:
+                    for i, seconds in enumerate(delta):
+                        bucket[i] += seconds
+            raise
+
+    def _flush(self, pending):
+        totals = {}
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            for (kind, key, day), delta in pending.items():
+                table = TABLES[kind]
+                row = self.conn.execute(f"SELECT hours FROM {table} WHERE id = ? AND day = ?", (key, day)).fetchone()
+                hours = array("I", row[0]) if row else empty_bucket()
+                for i, seconds in enumerate(delta):
+                    if seconds:
+                        hours[i] += seconds
+                self.conn.execute(
+                    f"INSERT OR REPLACE INTO {table} (id, day, hours, voice, camera) VALUES (?, ?, ?, ?, ?)",
+                    (key, day, hours.tobytes(), sum(hours[:24]), sum(hours[24:]))
+                )
+                self._add(totals, (kind, key), sum(delta[:24]), sum(delta[24:]))
+            self.conn.executemany(
+                "INSERT INTO totals (kind, id, voice, camera) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (kind, id) DO UPDATE SET "
+                "voice = voice + excluded.voice, camera = camera + excluded.camera",
+                [(kind, key, voice, camera) for (kind, key), (voice, camera) in totals.items()]
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def _aggregates(self, kind, period):
+        if period == "all":
+            return self.totals[kind]
+        if period == "today":
+            return self.days.get(self.today, {}).get(kind, {})
+        return self.window[kind]
+
+    def leaderboard(self, kind=MEMBER, period="week", metric="camera", limit=10):
+        """Returns the top ``limit`` ``(id, seconds)`` pairs."""
+        self._advance(current_day(self.clock()))
+        index = METRICS.index(metric)
+        return heapq.nlargest(
+            limit,
+            ((key, values[index]) for key, values in self._aggregates(kind, period).items() if values[index]),
+            key=lambda item: item[1]
+        )
+
+    def summary(self, kind, key, metric="camera"):
+        """Returns ``{period: (voice, camera, rank)}`` for one member or channel."""
+        self._advance(current_day(self.clock()))
+        index = METRICS.index(metric)
+        result = {}
+        for period in PERIODS:
+            aggregates = self._aggregates(kind, period)
+            voice, camera = aggregates.get(key, (0, 0))
+            mine = (voice, camera)[index]
+            rank = 1 + sum(1 for values in aggregates.values() if values[index] > mine) if mine else None
+            result[period] = (voice, camera, rank)
+        return result
+
+    async def hours(self, kind, key, days=7):
+        """Returns a 48-slot bucket summed over the last ``days`` days (by UTC hour)."""
+        first_day = current_day(self.clock()) - days + 1
+        total = empty_bucket()
+        # Taken before the read so a concurrent flush is counted exactly once
+        pending = self.pending
+        for row in await self._call(self._hours, kind, key, first_day):
+            for i, seconds in enumerate(array("I", row[0])):
+                total[i] += seconds
+        for (pending_kind, pending_key, day), bucket in pending.items():
+            if pending_kind == kind and pending_key == key and day >= first_day:
+                for i, seconds in enumerate(bucket):
+                    total[i] += seconds
+        return total
+
+    def _hours(self, kind, key, first_day):
+        if not self.conn:
+            return []
+        return self.conn.execute(
+            f"SELECT hours FROM {TABLES[kind]} WHERE id = ? AND day >= ?", (key, first_day)
+        ).fetchall()
@@ -0,0 +1,201 @@
+import re
+import sqlite3
+
+from utils.sqlite_thread import SQLiteThread
+
+SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS transcripts USING fts5(
+    participants,
+    content,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TABLE IF NOT EXISTS transcript_meta (
+    id INTEGER PRIMARY KEY,
+    creator INTEGER,
+    type TEXT,
+    created_at TEXT,
+    closed_at TEXT
+);
+CREATE INDEX IF NOT EXISTS transcript_meta_creator ON transcript_meta (creator);
+CREATE INDEX IF NOT EXISTS transcript_meta_created_at ON transcript_meta (created_at);
+"""
+
+# A ticket's text is indexed as chunks of about CHUNK_SIZE characters, each
+# its own FTS row with rowid ``ticket_id << CHUNK_BITS | n``
+CHUNK_SIZE = 1 << 18
+CHUNK_BITS = 16
+
+
+def chunk_lines(lines, size=CHUNK_SIZE):
+    """Groups ``lines`` into strings of about ``size`` characters, never splitting a line."""
+    chunk = []
+    length = 0
+    for line in lines:
+        if chunk and length + len(line) > size:
+            yield "".join(chunk)
+            chunk = []
+            length = 0
+        chunk.append(line)
+        length += len(line)
+    if chunk:
+        yield "".join(chunk)
+
+
+# An optional column filter, then a "phrase" (closing quote optional) or a bare word
+QUERY_TOKEN = re.compile(r'(?:(participants):)?(?:"([^"]*)"?(\*?)|([^\s"]+))', re.IGNORECASE)
+OPERATORS = ("AND", "OR", "NOT")
+
+
+def match_query(text):
+    """Turns search input into an FTS5 ``MATCH`` expression.
+
+    Every term is quoted, so punctuation such as ``what's`` or ``foo-bar``
+    is never read as FTS5 syntax. Only ``AND`` / ``OR`` / ``NOT``,
+    ``"phrases"``, a trailing ``*`` for prefixes and ``participants:`` pass
+    through; other operators with nothing on one side are dropped. Raises
+    ``ValueError`` for a leading ``NOT`` or if no searchable term is left.
+    """
+    parts = []
+    for match in QUERY_TOKEN.finditer(text):
+        column, phrase, phrase_prefix, word = match.groups()
+        if word in OPERATORS and not column:
+            if parts and parts[-1] in OPERATORS:
+                parts[-1] = word
+            elif parts:
+                parts.append(word)
+            elif word == "NOT":
+                # Dropping it would search for the very term to exclude
+                raise ValueError("NOT needs a term before it, e.g. refund NOT spam")
+            continue
+
+        if phrase is not None:
+            term, prefix = phrase, phrase_prefix
+        else:
+            term, prefix = word.rstrip("*"), "*" if word.endswith("*") else ""
+        if not re.search(r"\w", term):
+            continue
+        term = '"' + term.replace('"', '""') + '"' + prefix
+        if parts and parts[-1] not in OPERATORS:
+            # Adjacent terms are an implicit AND
+            parts.append("AND")
+        parts.append(f"participants:{term}" if column else term)
+
+    while parts and parts[-1] in OPERATORS:
+        parts.pop()
+    if not parts:
+        raise ValueError("Search query has no words to look for")
+    return " ".join(parts)
+
+
+class SearchResult:
+    __slots__ = ("ticket_id", "creator", "type", "created_at", "closed_at", "snippet")
+
+    def __init__(self, ticket_id, creator, type, created_at, closed_at, snippet):
+        self.ticket_id = str(ticket_id)
+        self.creator = creator
+        self.type = type
+        self.created_at = created_at
+        self.closed_at = closed_at
+        self.snippet = snippet
+
+
+class TicketSearchIndex(SQLiteThread):
+    """Full-text index over closed ticket transcripts (SQLite FTS5).
+
+    FTS5 keeps an on-disk inverted index of token -> (ticket, position)
+    lists, so queries support ``AND`` / ``OR`` / ``NOT``, ``"exact phrases"``,
+    ``prefix*`` and column filters such as ``participants:alice`` without
+    scanning transcripts. Each ticket is added once when its transcript is
+    generated, as one row per ``CHUNK_SIZE`` chunk of text so indexing never
+    holds a whole transcript in memory; results are grouped back per ticket,
+    so a query whose terms only match together across two chunks of one very
+    long ticket won't find it. Ticket metadata sits in an indexed side table
+    for the creator and date filters.
+
+    The public methods are coroutines run on the index's database thread.
+    """
+
+    SCHEMA = SCHEMA
+    THREAD_NAME = "ticket-search"
+
+    async def add(self, ticket_id, ticket, participants, chunks):
+        """Indexes (or re-indexes) one ticket's transcript text.
+
+        ``chunks`` is an iterable of text chunks (see ``chunk_lines``); it is
+        consumed on the database thread, so it may read from a file.
+        """
+        await self._call(self._add, int(ticket_id), ticket, participants, chunks)
+
+    def _add(self, ticket_id, ticket, participants, chunks):
+        first = ticket_id << CHUNK_BITS
+        participants = " ".join(participants)
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute(
+                "DELETE FROM transcripts WHERE rowid BETWEEN ? AND ?",
+                (first, first + (1 << CHUNK_BITS) - 1)
+            )
+            for n, content in enumerate(chunks):
+                if n >> CHUNK_BITS:
+                    raise ValueError(f"Ticket {ticket_id} has more than {1 << CHUNK_BITS} chunks of text")
+                self.conn.execute(
+                    "INSERT INTO transcripts (rowid, participants, content) VALUES (?, ?, ?)",
+                    (first + n, participants, content)
+                )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO transcript_meta (id, creator, type, created_at, closed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (ticket_id, ticket.get("creator"), ticket.get("type"),
+                 ticket.get("created_at"), ticket.get("closed_at"))
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    async def search(self, query, creator=None, after=None, before=None, page=1, per_page=10):
+        """Returns ``(total, results)`` for one page, best matches first.
+
+        ``after`` / ``before`` are ISO dates compared against the ticket's
+        creation time. Raises ``ValueError`` for malformed queries.
+        """
+        return await self._call(self._search, match_query(query), creator, after, before, page, per_page)
+
+    def _search(self, query, creator, after, before, page, per_page):
+        clauses = []
+        params = []
+        if creator is not None:
+            clauses.append("m.creator = ?")
+            params.append(creator)
+        if after:
+            clauses.append("m.created_at >= ?")
+            params.append(after)
+        if before:
+            clauses.append("m.created_at < ?")
+            params.append(before)
+        filters = "".join(f" AND {clause}" for clause in clauses)
+
+        try:
+            total = self.conn.execute(
+                f"SELECT COUNT(DISTINCT transcripts.rowid >> {CHUNK_BITS}) FROM transcripts "
+                f"JOIN transcript_meta m ON m.id = transcripts.rowid >> {CHUNK_BITS} "
+                f"WHERE transcripts MATCH ?{filters}",
+                [query, *params]
+            ).fetchone()[0]
+            # Each ticket appears once, with the snippet of its best-ranked chunk
+            rows = self.conn.execute(
+                f"WITH hits AS ("
+                f"SELECT rowid >> {CHUNK_BITS} AS ticket, rank, "
+                f"snippet(transcripts, 1, '**', '**', '...', 16) AS snippet "
+                f"FROM transcripts WHERE transcripts MATCH ?"
+                f"), best AS ("
+                f"SELECT *, ROW_NUMBER() OVER (PARTITION BY ticket ORDER BY rank) AS n FROM hits"
+                f") "
+                f"SELECT m.id, m.creator, m.type, m.created_at, m.closed_at, best.snippet "
+                f"FROM best JOIN transcript_meta m ON m.id = best.ticket "
+                f"WHERE best.n = 1{filters} ORDER BY best.rank LIMIT ? OFFSET ?",
+                [query, *params, per_page, (max(page, 1) - 1) * per_page]
+            ).fetchall()
+        except sqlite3.OperationalError as e:
+            raise ValueError(str(e)) from e
+        return total, [SearchResult(*row) for row in rows]
@@ -0,0 +1,301 @@
+import asyncio
+import json
+import os
+import sqlite3
+import zlib
+
+from utils.sqlite_thread import SQLiteThread
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickets (
+    id INTEGER PRIMARY KEY,
+    channel_id INTEGER,
+    creator INTEGER,
+    created_at TEXT,
+    type TEXT,
+    status TEXT NOT NULL DEFAULT 'open',
+    claimed_by INTEGER,
+    closed_by INTEGER,
+    closed_at TEXT,
+    close_reason TEXT,
+    application_data TEXT
+);
+CREATE INDEX IF NOT EXISTS tickets_status ON tickets (status);
+CREATE INDEX IF NOT EXISTS tickets_creator ON tickets (creator);
+CREATE INDEX IF NOT EXISTS tickets_claimed_by ON tickets (claimed_by);
+CREATE INDEX IF NOT EXISTS tickets_created_at ON tickets (created_at);
+
+-- Closed tickets: insert-only, zlib-compressed JSON keyed by ticket ID
+CREATE TABLE IF NOT EXISTS archive (
+    id INTEGER PRIMARY KEY,
+    data BLOB NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS sequences (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+COLUMNS = (
+    "channel_id", "creator", "created_at", "type", "status", "claimed_by",
+    "closed_by", "closed_at", "close_reason", "application_data",
+)
+
+
+def to_row(ticket):
+    row = [ticket.get(column) for column in COLUMNS]
+    row[-1] = json.dumps(row[-1]) if row[-1] is not None else None
+    return row
+
+
+def from_row(row):
+    ticket = dict(zip(COLUMNS, row[1:]))
+    if ticket["application_data"] is not None:
+        ticket["application_data"] = json.loads(ticket["application_data"])
+    return str(row[0]), ticket
+
+
+class TicketStore(SQLiteThread):
+    """Tickets in a SQLite database (WAL mode), accessed through one dedicated thread.
+
+    Every write touches only the rows it changes, so the cost of claiming or
+    closing a ticket no longer grows with the number of tickets ever opened.
+    Ticket IDs come from a sequence row bumped inside the same database, so
+    an ID is never handed out twice even across restarts.
+
+    Only open tickets live in the indexed ``tickets`` table. Closing a ticket
+    moves its row into ``archive`` as one compressed blob, so the hot table
+    and its indexes stay the size of the open set; ``get`` falls back to the
+    archive for old ticket numbers. The public methods
+    are coroutines; the connection lives on the store's own thread and the
+    event loop never blocks on disk.
+    """
+
+    SCHEMA = SCHEMA
+    THREAD_NAME = "ticket-store"
+
+    # IDs
+    async def lease_ids(self, count):
+        """Reserves ``count`` consecutive IDs and returns the last one."""
+        return await self._call(self._lease, count)
+
+    def _lease(self, count):
+        # The UPDATE takes the write lock, so concurrent processes serialize here
+        row = self.conn.execute(
+            "INSERT INTO sequences (name, value) VALUES ('ticket', ?) "
+            "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value RETURNING value",
+            (count,)
+        ).fetchone()
+        return row[0]
+
+    async def release_ids(self, first, last):
+        """Hands back ``first..last`` if nobody has leased past them since."""
+        return await self._call(self._release, first, last)
+
+    def _release(self, first, last):
+        cursor = self.conn.execute(
+            "UPDATE sequences SET value = ? WHERE name = 'ticket' AND value = ?",
+            (first - 1, last)
+        )
+        return cursor.rowcount == 1
+
+    # Tickets
+    def insert(self, ticket_id, ticket):
+        """Queues the insert on the store's thread and returns its future.
+
+        The write is submitted immediately, so it always lands before any
+        later update to the same ticket; callers may await the future or let
+        it finish in the background.
+        """
+        return self._submit(self._insert, ticket_id, ticket)
+
+    def _insert(self, ticket_id, ticket):
+        self.conn.execute(
+            f"INSERT INTO tickets (id, {', '.join(COLUMNS)}) VALUES (?{', ?' * len(COLUMNS)})",
+            [int(ticket_id), *to_row(ticket)]
+        )
+
+    async def update(self, ticket_id, **fields):
+        await self._call(self._update, ticket_id, fields)
+
+    def _update(self, ticket_id, fields):
+        if "application_data" in fields and fields["application_data"] is not None:
+            fields["application_data"] = json.dumps(fields["application_data"])
+        assignments = ", ".join(f"{column} = ?" for column in fields if column in COLUMNS)
+        values = [value for column, value in fields.items() if column in COLUMNS]
+        self.conn.execute(f"UPDATE tickets SET {assignments} WHERE id = ?", [*values, int(ticket_id)])
+
+    async def get(self, ticket_id):
+        """Looks in the open tickets first, then in the archive."""
+        return await self._call(self._get, int(ticket_id))
+
+    def _get(self, ticket_id):
+        row = self.conn.execute("SELECT * FROM tickets WHERE id = ?", (ticket_id,)).fetchone()
+        if row:
+            return from_row(row)[1]
+        row = self.conn.execute("SELECT data FROM archive WHERE id = ?", (ticket_id,)).fetchone()
+        return json.loads(zlib.decompress(row[0])) if row else None
+
+    # Archive
+    async def archive(self, ticket_id, **fields):
+        """Applies the final ``fields`` and moves the ticket into the archive."""
+        await self._call(self._archive, [int(ticket_id)], fields)
+
+    async def archive_closed(self):
+        """Moves any closed tickets still in the open table (e.g. just migrated)."""
+        rows = await self._call(self._fetchall, "SELECT id FROM tickets WHERE status = 'closed'", ())
+        if rows:
+            await self._call(self._archive, [row[0] for row in rows], {})
+        return len(rows)
+
+    def _archive(self, ticket_ids, fields):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            for ticket_id in ticket_ids:
+                if fields:
+                    self._update(ticket_id, dict(fields))
+                row = self.conn.execute("SELECT * FROM tickets WHERE id = ?", (ticket_id,)).fetchone()
+                if not row:
+                    continue
+                data = zlib.compress(json.dumps(from_row(row)[1], separators=(",", ":")).encode())
+                self.conn.execute("INSERT OR REPLACE INTO archive (id, data) VALUES (?, ?)", (ticket_id, data))
+                self.conn.execute("DELETE FROM tickets WHERE id = ?", (ticket_id,))
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    async def find(self, status=None, creator=None, claimed_by=None, since=None, limit=None):
+        """Returns open ``{ticket_id: ticket}`` matching every given filter, oldest first."""
+        clauses, params = [], []
+        for column, value in (("status", status), ("creator", creator), ("claimed_by", claimed_by)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+
+        query = "SELECT * FROM tickets"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY id"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        rows = await self._call(self._fetchall, query, params)
+        return dict(from_row(row) for row in rows)
+
+    def _fetchone(self, query, params):
+        return self.conn.execute(query, params).fetchone()
+
+    def _fetchall(self, query, params):
+        return self.conn.execute(query, params).fetchall()
+
+    # Small key/value settings (ticket creation message ID...)
+    async def get_meta(self, key):
+        row = await self._call(self._fetchone, "SELECT value FROM meta WHERE key = ?", (key,))
+        return row[0] if row else None
+
+    async def set_meta(self, key, value):
+        await self._call(self._set_meta, key, value)
+
+    def _set_meta(self, key, value):
+        self.conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (key, None if value is None else str(value))
+        )
+
+    # Migration
+    async def migrate(self, tickets_file, counter_file, message_file):
+        """One-shot import of the old tickets.json / counter / message ID files.
+
+        Runs in a single transaction and renames the old files to
+        ``*.migrated`` afterwards, so it only ever happens once.
+        """
+        return await self._call(self._migrate, tickets_file, counter_file, message_file)
+
+    def _migrate(self, tickets_file, counter_file, message_file):
+        legacy = [path for path in (tickets_file, counter_file, message_file) if os.path.exists(path)]
+        if not legacy:
+            return 0
+
+        tickets = {}
+        counter = 0
+        message_id = None
+        if os.path.exists(tickets_file):
+            with open(tickets_file, "r") as f:
+                tickets = json.load(f)
+        if os.path.exists(counter_file):
+            with open(counter_file, "r") as f:
+                counter = int(f.read().strip() or 0)
+        if os.path.exists(message_file):
+            with open(message_file, "r") as f:
+                message_id = f.read().strip() or None
+
+        # Never hand out an ID that an imported ticket already uses
+        counter = max([counter, *(int(ticket_id) for ticket_id in tickets)])
+
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.executemany(
+                f"INSERT OR IGNORE INTO tickets (id, {', '.join(COLUMNS)}) VALUES (?{', ?' * len(COLUMNS)})",
+                [[int(ticket_id), *to_row(ticket)] for ticket_id, ticket in tickets.items()]
+            )
+            self.conn.execute(
+                "INSERT INTO sequences (name, value) VALUES ('ticket', ?) "
+                "ON CONFLICT (name) DO UPDATE SET value = MAX(value, excluded.value)",
+                (counter,)
+            )
+            if message_id:
+                self._set_meta("creation_message_id", message_id)
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+        for path in legacy:
+            os.replace(path, path + ".migrated")
+        return len(tickets)
+
+
+class TicketIdAllocator:
+    """Hands out ticket IDs from blocks leased off the store's sequence.
+
+    Leasing a block is one atomic UPDATE in the shared database, so several
+    bot processes on the same host never see the same ID; inside a process
+    IDs are then handed out from memory, and the lock makes sure concurrent
+    interactions waiting on an empty block trigger only one lease. IDs stay
+    unique but are only ordered per process, and a block that is still
+    partly unused at shutdown is handed back when no other process has
+    leased after it.
+    """
+
+    def __init__(self, store, block_size=10):
+        self.store = store
+        self.block_size = block_size
+        self.lock = asyncio.Lock()
+        self.next = 0
+        self.last = -1
+        self.leases = 0
+
+    async def next_id(self):
+        async with self.lock:
+            if self.next > self.last:
+                self.last = await self.store.lease_ids(self.block_size)
+                self.next = self.last - self.block_size + 1
+                self.leases += 1
+            ticket_id = self.next
+            self.next += 1
+        return str(ticket_id)
+
+    async def release(self):
+        async with self.lock:
+            if self.next <= self.last:
+                await self.store.release_ids(self.next, self.last)
+            self.next, self.last = 0, -1
@@ -0,0 +1,133 @@
+import json
+import os
+from collections import OrderedDict
+
+from utils.journal import read_journal
+
+
+class TranscriptLog:
+    """Append-only per-ticket message logs, written as messages arrive.
+
+    Each ticket channel gets one JSON-lines file with three kinds of record:
+    ``m`` (message), ``e`` (edit, only the fields that changed) and ``d``
+    (delete). Closing a ticket then only has to fold the file into the final
+    transcript instead of paging the whole channel history over REST.
+
+    At most ``max_open`` files are kept open at once; the least recently
+    written one is closed when the limit is hit.
+    """
+
+    def __init__(self, directory="ticket_logs", max_open=64):
+        self.directory = directory
+        self.max_open = max_open
+        self.handles = OrderedDict()
+        self.last_ids = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, ticket_id):
+        return os.path.join(self.directory, f"{ticket_id}.jsonl")
+
+    def _handle(self, ticket_id):
+        handle = self.handles.get(ticket_id)
+        if handle:
+            self.handles.move_to_end(ticket_id)
+            return handle
+        if len(self.handles) >= self.max_open:
+            _, oldest = self.handles.popitem(last=False)
+            oldest.close()
+        handle = open(self.path(ticket_id), "a", encoding="utf-8")
+        self.handles[ticket_id] = handle
+        return handle
+
+    def _append(self, ticket_id, record):
+        handle = self._handle(ticket_id)
+        handle.write(json.dumps(record, separators=(",", ":")) + "\n")
+        handle.flush()
+
+    # Recording
+    def record_message(self, ticket_id, message):
+        self._append(ticket_id, {
+            "op": "m",
+            "id": message.id,
+            "a": message.author.id,
+            "n": message.author.name,
+            "t": message.created_at.timestamp(),
+            "c": message.content,
+            "e": [embed.to_dict() for embed in message.embeds],
+            "u": {str(user.id): user.name for user in message.mentions},
+        })
+        self.last_ids[ticket_id] = max(message.id, self.last_ids.get(ticket_id) or 0)
+
+    def record_edit(self, ticket_id, message_id, data):
+        """Records an edit from a raw gateway payload; missing fields were not changed."""
+        record = {"op": "e", "id": message_id}
+        if "content" in data:
+            record["c"] = data["content"]
+        if "embeds" in data:
+            record["e"] = data["embeds"]
+        self._append(ticket_id, record)
+
+    def record_delete(self, ticket_id, message_id):
+        self._append(ticket_id, {"op": "d", "id": message_id})
+
+    def last_message_id(self, ticket_id):
+        """ID of the newest recorded message, or ``None`` if nothing was recorded yet."""
+        if ticket_id not in self.last_ids:
+            last_id = None
+            for record in self._records(ticket_id):
+                if record["op"] == "m":
+                    last_id = max(record["id"], last_id or 0)
+            self.last_ids[ticket_id] = last_id
+        return self.last_ids[ticket_id]
+
+    # Reading
+    def _records(self, ticket_id):
+        return read_journal(self.path(ticket_id))
+
+    def changes(self, ticket_id):
+        """First pass over the log: the latest edit of each message and the deleted IDs."""
+        edits = {}
+        deleted = set()
+        for record in self._records(ticket_id):
+            if record["op"] == "e":
+                edits.setdefault(record["id"], {}).update(record)
+            elif record["op"] == "d":
+                deleted.add(record["id"])
+        return edits, deleted
+
+    def read_batches(self, ticket_id, edits, deleted, size=500):
+        """Second pass: yields lists of final message records, oldest first.
+
+        A message backfilled twice (reconnect overlap) is only emitted once.
+        """
+        seen = set()
+        batch = []
+        for record in self._records(ticket_id):
+            if record["op"] != "m" or record["id"] in deleted or record["id"] in seen:
+                continue
+            seen.add(record["id"])
+            edit = edits.get(record["id"])
+            if edit:
+                record.update({key: edit[key] for key in ("c", "e") if key in edit})
+            batch.append(record)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    # Cleanup
+    def close(self, ticket_id=None):
+        ticket_ids = [ticket_id] if ticket_id is not None else list(self.handles)
+        for key in ticket_ids:
+            handle = self.handles.pop(key, None)
+            if handle:
+                handle.close()
+
+    def remove(self, ticket_id):
+        self.close(ticket_id)
+        self.last_ids.pop(ticket_id, None)
+        try:
+            os.remove(self.path(ticket_id))
+        except FileNotFoundError:
+            pass
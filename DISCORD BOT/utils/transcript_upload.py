@@ -0,0 +1,288 @@
+import asyncio
+import base64
+import datetime
+import hashlib
+import hmac
+import os
+import random
+import shutil
+from urllib.parse import quote, urlsplit
+
+import aiohttp
+
+
+class UploadError(Exception):
+    """The upload failed in a way retrying will not fix (bad token, bad repo...)."""
+
+
+class RetryableError(UploadError):
+    """Server error, dropped connection or lost race; worth another attempt."""
+
+
+class RateLimited(RetryableError):
+    def __init__(self, retry_after):
+        super().__init__(f"Rate limited for {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+async def check_response(response):
+    if response.status in (403, 429):
+        retry_after = response.headers.get("Retry-After")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if retry_after:
+            raise RateLimited(float(retry_after))
+        if reset and response.headers.get("X-RateLimit-Remaining") == "0":
+            raise RateLimited(max(float(reset) - datetime.datetime.now().timestamp(), 1.0))
+    if response.status >= 500:
+        raise RetryableError(f"{response.status} from {response.url}")
+    if response.status >= 400:
+        raise UploadError(f"{response.status} from {response.url}: {await response.text()}")
+
+
+# Backends
+class LocalDirectoryBackend:
+    """Copies transcripts into a directory, optionally served from ``base_url``."""
+
+    def __init__(self, directory, base_url=None):
+        self.directory = directory
+        self.base_url = base_url
+
+    async def upload(self, files):
+        def copy():
+            os.makedirs(self.directory, exist_ok=True)
+            for name, path in files:
+                shutil.copyfile(path, os.path.join(self.directory, name))
+
+        await asyncio.to_thread(copy)
+        if self.base_url:
+            return [f"{self.base_url.rstrip('/')}/{quote(name)}" for name, _ in files]
+        return [os.path.abspath(os.path.join(self.directory, name)) for name, _ in files]
+
+
+class GitHubBackend:
+    """Commits transcripts to ``transcripts/`` in a GitHub repository.
+
+    A single file goes through the contents API (one request). A batch is
+    written as one commit through the git data API: one tree with every file
+    inlined, one commit, one ref update, regardless of the batch size.
+    ``api_url`` can point at a local stand-in server.
+    """
+
+    def __init__(self, session, token, repo, branch="main", folder="transcripts",
+                 api_url="https://api.github.com"):
+        self.session = session
+        self.repo = repo
+        self.branch = branch
+        self.folder = folder
+        self.api_url = api_url.rstrip("/")
+        self.headers = {
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/vnd.github+json"
+        }
+
+    def blob_url(self, name):
+        return f"https://github.com/{self.repo}/blob/{self.branch}/{self.folder}/{name}"
+
+    async def request(self, method, path, payload=None):
+        url = f"{self.api_url}/repos/{self.repo}/{path}"
+        async with self.session.request(method, url, headers=self.headers, json=payload) as response:
+            if method == "PATCH" and response.status == 422:
+                # Someone else moved the branch between our read and write
+                raise RetryableError("Branch moved during batch commit")
+            await check_response(response)
+            return await response.json()
+
+    async def upload(self, files):
+        contents = await asyncio.to_thread(read_files, files)
+        if len(files) == 1:
+            (name, _), data = files[0], contents[0]
+            await self.request("PUT", f"contents/{self.folder}/{name}", {
+                "message": f"Add transcript {name}",
+                "content": base64.b64encode(data).decode(),
+                "branch": self.branch
+            })
+            return [self.blob_url(name)]
+
+        ref = await self.request("GET", f"git/ref/heads/{self.branch}")
+        parent = ref["object"]["sha"]
+        commit = await self.request("GET", f"git/commits/{parent}")
+        tree = await self.request("POST", "git/trees", {
+            "base_tree": commit["tree"]["sha"],
+            "tree": [
+                {
+                    "path": f"{self.folder}/{name}",
+                    "mode": "100644",
+                    "type": "blob",
+                    "content": data.decode("utf-8")
+                }
+                for (name, _), data in zip(files, contents)
+            ]
+        })
+        new_commit = await self.request("POST", "git/commits", {
+            "message": f"Add {len(files)} transcripts",
+            "tree": tree["sha"],
+            "parents": [parent]
+        })
+        await self.request("PATCH", f"git/refs/heads/{self.branch}", {"sha": new_commit["sha"]})
+        return [self.blob_url(name) for name, _ in files]
+
+
+class S3Backend:
+    """PUTs transcripts to an S3-compatible bucket (AWS, MinIO, R2...) with SigV4 signing."""
+
+    def __init__(self, session, endpoint, bucket, access_key, secret_key, region="us-east-1",
+                 prefix="transcripts", public_url=None):
+        self.session = session
+        self.endpoint = endpoint.rstrip("/")
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.prefix = prefix
+        self.public_url = public_url
+
+    def sign(self, method, url, payload_hash, now):
+        parts = urlsplit(url)
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        date = now.strftime("%Y%m%d")
+        headers = {
+            "host": parts.netloc,
+            "x-amz-content-sha256": payload_hash,
+            "x-amz-date": amz_date,
+        }
+        signed_headers = ";".join(sorted(headers))
+        canonical_request = "\n".join([
+            method,
+            parts.path,
+            "",
+            "".join(f"{k}:{headers[k]}\n" for k in sorted(headers)),
+            signed_headers,
+            payload_hash,
+        ])
+        scope = f"{date}/{self.region}/s3/aws4_request"
+        string_to_sign = "\n".join([
+            "AWS4-HMAC-SHA256",
+            amz_date,
+            scope,
+            hashlib.sha256(canonical_request.encode()).hexdigest(),
+        ])
+
+        key = ("AWS4" + self.secret_key).encode()
+        for part in (date, self.region, "s3", "aws4_request"):
+            key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+        signature = hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+        headers["Authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, "
+            f"SignedHeaders={signed_headers}, Signature={signature}"
+        )
+        del headers["host"]
+        return headers
+
+    async def put(self, name, data):
+        key = quote(f"{self.prefix}/{name}")
+        url = f"{self.endpoint}/{self.bucket}/{key}"
+        headers = self.sign("PUT", url, hashlib.sha256(data).hexdigest(), datetime.datetime.now(datetime.timezone.utc))
+        headers["Content-Type"] = "text/html; charset=utf-8"
+        async with self.session.put(url, data=data, headers=headers) as response:
+            await check_response(response)
+        if self.public_url:
+            return f"{self.public_url.rstrip('/')}/{key}"
+        return url
+
+    async def upload(self, files):
+        contents = await asyncio.to_thread(read_files, files)
+        return await asyncio.gather(*(
+            self.put(name, data) for (name, _), data in zip(files, contents)
+        ))
+
+
+def read_files(files):
+    contents = []
+    for _, path in files:
+        with open(path, "rb") as f:
+            contents.append(f.read())
+    return contents
+
+
+class TranscriptUploader:
+    """Background upload queue in front of a transcript backend.
+
+    ``submit`` returns a future resolving to the transcript URL (or ``None``
+    once retries run out). A single worker takes the next transcript plus
+    anything else already waiting, up to ``max_batch``, so closes that arrive
+    while an upload is in flight go out together in one batch. Nothing waits
+    for a batch to fill. Retryable failures back off exponentially with jitter;
+    rate limits wait for the time the server asked for. ``stop`` cancels the
+    futures of everything not uploaded yet, so callers waiting on them can
+    clean up.
+    """
+
+    def __init__(self, backend, max_batch=10, max_retries=5, base_delay=1.0, max_delay=60.0):
+        self.backend = backend
+        self.max_batch = max_batch
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.queue = asyncio.Queue()
+        self.task = None
+        self.stats = {"uploaded": 0, "failed": 0, "batches": 0, "retries": 0, "rate_limited": 0}
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        while not self.queue.empty():
+            _, _, future = self.queue.get_nowait()
+            future.cancel()
+
+    def submit(self, name, path):
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((name, path, future))
+        return future
+
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.max_batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                await self._upload(batch)
+            except asyncio.CancelledError:
+                for _, _, future in batch:
+                    future.cancel()
+                raise
+
+    async def _upload(self, batch):
+        files = [(name, path) for name, path, _ in batch]
+        urls = None
+        for attempt in range(self.max_retries + 1):
+            try:
+                urls = await self.backend.upload(files)
+                self.stats["uploaded"] += len(batch)
+                self.stats["batches"] += 1
+                break
+            except RateLimited as e:
+                self.stats["rate_limited"] += 1
+                delay = e.retry_after
+            except (RetryableError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                delay = min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+                print(f"Transcript upload failed (attempt {attempt + 1}): {e}")
+            except Exception as e:
+                print(f"Transcript upload failed: {e}")
+                break
+            if attempt < self.max_retries:
+                self.stats["retries"] += 1
+                await asyncio.sleep(delay)
+
+        if urls is None:
+            self.stats["failed"] += len(batch)
+            urls = [None] * len(batch)
+        for (_, _, future), url in zip(batch, urls):
+            if not future.done():
+                future.set_result(url)
@@ -0,0 +1,63 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class VerdictCache:
+    """LRU + TTL cache of scan verdicts keyed by a hash of the message text.
+
+    ``scope`` names the rule set a verdict was computed against, so guilds
+    with different keyword lists never share entries.
+
+    Each entry remembers the matcher generation it was computed with; the
+    whole cache is dropped the first time a lookup sees a newer generation,
+    so changing the keyword list never serves stale verdicts. Scans may run
+    on the pipeline's thread pool, so access is guarded by a lock.
+    """
+
+    def __init__(self, maxsize=4096, ttl=300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.generation = None
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(content, scope=None):
+        return scope, hash(content), len(content)
+
+    def get(self, content, generation, scope=None):
+        key = self.key(content, scope)
+        now = time.monotonic()
+        with self.lock:
+            if generation != self.generation:
+                self.entries.clear()
+                self.generation = generation
+            entry = self.entries.get(key)
+            if entry is None or now - entry[0] > self.ttl:
+                if entry is not None:
+                    del self.entries[key]
+                    self.evictions += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, content, generation, verdict, scope=None):
+        key = self.key(content, scope)
+        with self.lock:
+            if generation != self.generation:
+                return
+            self.entries[key] = (time.monotonic(), verdict)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
@@ -0,0 +1,175 @@
+import asyncio
+import json
+import os
+import time
+
+from utils.journal import read_journal
+
+
+class WarningStore:
+    """Per-member warning history backed by a snapshot plus an append-only journal.
+
+    Every change is appended to the journal as one JSON line (warn, remove,
+    expire or reset) instead of rewriting the whole file. ``compact`` folds the journal
+    into a new snapshot written to a temp file and atomically renamed over the
+    old one. On startup the snapshot is loaded and only the journal tail is
+    replayed.
+
+    The snapshot keeps the old ``warnings.json`` name. A legacy file holding
+    plain ``{user_id: count}`` pairs is read as that many warnings with no
+    recorded reason.
+    """
+
+    def __init__(self, snapshot_path="warnings.json", journal_path="warnings.journal"):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.rotated_path = journal_path + ".1"
+        self.warnings = {}
+        self.seq = 0
+        self.pending = 0
+        self.compacting = None
+
+        self.load()
+        self.journal = open(self.journal_path, "a", encoding="utf-8")
+
+    # Loading
+    def load(self):
+        snapshot_seq = 0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if "warnings" in data:
+                snapshot_seq = data.get("seq", 0)
+                self.warnings = data["warnings"]
+            else:
+                self.warnings = {
+                    user_id: [
+                        {"id": None, "moderator": None, "reason": None, "timestamp": None}
+                        for _ in range(count)
+                    ]
+                    for user_id, count in data.items() if count > 0
+                }
+        self.seq = snapshot_seq
+
+        # A crash mid-compaction leaves the rotated journal behind
+        for path in (self.rotated_path, self.journal_path):
+            self.pending += self._replay(path, snapshot_seq)
+
+    def _replay(self, path, after_seq):
+        replayed = 0
+        for record in read_journal(path):
+            if record["seq"] <= after_seq:
+                continue
+            self._apply(record)
+            self.seq = max(self.seq, record["seq"])
+            replayed += 1
+        return replayed
+
+    def _apply(self, record):
+        user_id = record["user"]
+        op = record["op"]
+        if op == "warn":
+            self.warnings.setdefault(user_id, []).append({
+                "id": record["seq"],
+                "moderator": record.get("moderator"),
+                "reason": record.get("reason"),
+                "timestamp": record["timestamp"],
+            })
+        elif op == "remove":
+            entries = self.warnings.get(user_id, [])
+            del entries[max(len(entries) - record["count"], 0):]
+            if not entries:
+                self.warnings.pop(user_id, None)
+        elif op == "expire":
+            entries = [e for e in self.warnings.get(user_id, []) if e["id"] != record["warning"]]
+            if entries:
+                self.warnings[user_id] = entries
+            else:
+                self.warnings.pop(user_id, None)
+        elif op == "reset":
+            self.warnings.pop(user_id, None)
+
+    def _append(self, op, user_id, **fields):
+        self.seq += 1
+        record = {
+            "seq": self.seq,
+            "op": op,
+            "user": str(user_id),
+            "timestamp": time.time(),
+            **fields,
+        }
+        self._apply(record)
+        self.journal.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.journal.flush()
+        self.pending += 1
+        return record
+
+    # Public API
+    def count(self, user_id):
+        return len(self.warnings.get(str(user_id), []))
+
+    def history(self, user_id):
+        return list(self.warnings.get(str(user_id), []))
+
+    def add(self, user_id, moderator_id, reason):
+        """Records a warning and returns its journal record (``seq`` is the warning id)."""
+        return self._append("warn", user_id, moderator=moderator_id, reason=reason)
+
+    def remove(self, user_id, count, moderator_id):
+        self._append("remove", user_id, count=count, moderator=moderator_id)
+        return self.count(user_id)
+
+    def expire(self, user_id, warning_id):
+        if not any(e["id"] == warning_id for e in self.warnings.get(str(user_id), [])):
+            return False
+        self._append("expire", user_id, warning=warning_id)
+        return True
+
+    def reset(self, user_id, moderator_id, reason=None):
+        self._append("reset", user_id, moderator=moderator_id, reason=reason)
+
+    # Compaction
+    async def compact(self):
+        if self.compacting or not self.pending:
+            return False
+
+        # Rotate on the loop so appends made during the write land in a fresh journal
+        self.journal.close()
+        if os.path.exists(self.rotated_path):
+            with open(self.journal_path, "r", encoding="utf-8") as src, \
+                    open(self.rotated_path, "a", encoding="utf-8") as dst:
+                dst.write(src.read())
+            os.remove(self.journal_path)
+        else:
+            os.replace(self.journal_path, self.rotated_path)
+        self.journal = open(self.journal_path, "a", encoding="utf-8")
+
+        snapshot = {
+            "seq": self.seq,
+            "warnings": {user_id: list(entries) for user_id, entries in self.warnings.items()},
+        }
+        rotated, self.pending = self.pending, 0
+        self.compacting = asyncio.get_running_loop().run_in_executor(
+            None, self._write_snapshot, snapshot
+        )
+        try:
+            await self.compacting
+        except Exception:
+            # The rotated journal is kept and folded in on the next attempt
+            self.pending += rotated
+            raise
+        finally:
+            self.compacting = None
+        return True
+
+    def _write_snapshot(self, snapshot):
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        os.remove(self.rotated_path)
+
+    def close(self):
+        self.journal.close()